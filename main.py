@@ -1,11 +1,36 @@
-from src.api import app
+import sys
+
 import uvicorn
 
+from src.core.config import get_config
+
 
 def main():
-    print("Hello from o-platy60-backend!")
-    uvicorn.run("src.api.app:app", reload=True)
+    config = get_config()
+    if "--dev" in sys.argv:
+        uvicorn.run("src.api.app:app", reload=True)
+        return
+    if config.IDEMPOTENCY_ENABLED and config.WEB_CONCURRENCY > 1:
+        # Un réessai arriverait sur un autre worker et referait l'écriture
+        sys.exit(
+            "IDEMPOTENCY_ENABLED keeps Idempotency-Key responses in process "
+            "memory and requires WEB_CONCURRENCY=1"
+        )
+
+    # uvloop et httptools sont utilisés s'ils sont installés ("auto")
+    uvicorn.run(
+        "src.api.app:app",
+        host=config.HOST,
+        port=config.PORT,
+        workers=config.WEB_CONCURRENCY,
+        loop=config.SERVER_LOOP,
+        http=config.SERVER_HTTP,
+        proxy_headers=True,
+        # Sur SIGTERM : plus de nouvelles connexions, les requêtes en cours
+        # ont ce délai pour se terminer avant l'arrêt du worker
+        timeout_graceful_shutdown=config.GRACEFUL_SHUTDOWN_SECONDS,
+    )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+import json
+from typing import Any
+
+from src.api.route_match import match_route
+from src.core import metrics
+from src.core.config import Config, get_config
+
+CRITICAL, NORMAL, BULK = 0, 1, 2
+
+# Écritures qui passent avant tout le reste
+CRITICAL_ROUTES = {
+    "POST /api/v1/ingredients/adjust",
+    "POST /api/v1/ingredients/stock-count",
+    "POST /api/v1/orders/receive",
+    "POST /api/v1/recipes/production",
+}
+# Listings et exports, servis en dernier
+BULK_ROUTES = {
+    "GET /api/v1/ingredients/",
+    "GET /api/v1/ingredients/{sku}/history",
+    "GET /api/v1/orders/",
+    "GET /api/v1/orders/suggestions",
+    "GET /api/v1/recipes/",
+    "POST /api/v1/recipes/simulate-costs",
+}
+# Clé commune des chemins sans route (404) : un scan ne crée pas de limiteurs
+UNMATCHED_ROUTE = "unmatched"
+
+
+class PriorityLimiter:
+    """Sémaphore à priorités avec file d'attente bornée.
+
+    ``reserved`` places ne sont accessibles qu'aux requêtes critiques, et les
+    places libérées vont d'abord aux requêtes en attente les plus prioritaires.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, reserved: int = 0) -> None:
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.reserved = min(reserved, capacity - 1)
+        self.in_use = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def _limit(self, priority: int) -> int:
+        return self.capacity if priority == CRITICAL else self.capacity - self.reserved
+
+    def _queued(self, up_to: int = BULK) -> int:
+        """Requêtes en attente de priorité égale ou supérieure à ``up_to``"""
+        return sum(
+            1
+            for waiting, _, future in self._waiters
+            if waiting <= up_to and not future.done()
+        )
+
+    async def acquire(self, priority: int, timeout: float) -> bool:
+        # Une requête critique ne fait pas la queue derrière des requêtes
+        # moins prioritaires quand ses places réservées sont libres
+        if self.in_use < self._limit(priority) and not self._queued(priority):
+            self.in_use += 1
+            return True
+        if self._queued() >= self.max_queue:
+            return False
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # La place a été accordée au moment de l'abandon : on la rend
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self) -> None:
+        self.in_use -= 1
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_use >= self._limit(priority):
+                return
+            heapq.heappop(self._waiters)
+            self.in_use += 1
+            future.set_result(True)
+
+    def snapshot(self) -> dict[str, int]:
+        return {"in_use": self.in_use, "queued": self._queued()}
+
+
+class AdmissionControlMiddleware:
+    """Limite la concurrence globale et par route, et rejette vite au-delà.
+
+    Quand la file d'attente est pleine ou que l'attente dépasse le délai, la
+    requête reçoit un 503 avec Retry-After au lieu d'empiler les appels vers
+    Supabase.
+    """
+
+    def __init__(self, app: Any, config: Config | None = None) -> None:
+        config = config or get_config()
+        self.app = app
+        self.route_limit = config.ADMISSION_ROUTE_LIMIT
+        self.queue_size = config.ADMISSION_QUEUE_SIZE
+        self.queue_timeout = config.ADMISSION_QUEUE_TIMEOUT
+        self.retry_after = config.ADMISSION_RETRY_AFTER
+        self.global_limiter = PriorityLimiter(
+            config.ADMISSION_GLOBAL_LIMIT,
+            config.ADMISSION_QUEUE_SIZE,
+            reserved=config.ADMISSION_CRITICAL_RESERVED,
+        )
+        self.route_limiters: dict[str, PriorityLimiter] = {}
+        self.rejected = {"global": 0, "route": 0}
+        metrics.register("admission", self.snapshot)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "global": self.global_limiter.snapshot(),
+            "routes": {k: v.snapshot() for k, v in self.route_limiters.items()},
+            "rejected": dict(self.rejected),
+        }
+
+    def _priority(self, key: str) -> int:
+        if key in CRITICAL_ROUTES:
+            return CRITICAL
+        if key in BULK_ROUTES:
+            return BULK
+        return NORMAL
+
+    async def _reject(self, send: Any) -> None:
+        body = json.dumps(
+            {"detail": "Serveur saturé, réessayez dans quelques instants"}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api/v1/"):
+            await self.app(scope, receive, send)
+            return
+
+        path = getattr(match_route(scope), "path", None)
+        key = f"{scope['method']} {path}" if path else UNMATCHED_ROUTE
+        priority = self._priority(key)
+        route_limiter = self.route_limiters.setdefault(
+            key, PriorityLimiter(self.route_limit, self.queue_size)
+        )
+        if not await route_limiter.acquire(priority, self.queue_timeout):
+            self.rejected["route"] += 1
+            await self._reject(send)
+            return
+        try:
+            if not await self.global_limiter.acquire(priority, self.queue_timeout):
+                self.rejected["global"] += 1
+                await self._reject(send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.global_limiter.release()
+        finally:
+            route_limiter.release()
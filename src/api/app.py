@@ -1,14 +1,108 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from src.api.admission import AdmissionControlMiddleware
+from src.api.idempotency import IdempotencyMiddleware
+from src.api.profiling import ProfilingMiddleware
+from src.api.round_trips import RoundTripMiddleware
+from src.api.singleflight import SingleFlightMiddleware
 from src.api.v1 import auth
+from src.api.v1 import dashboard
 from src.api.v1 import ingredients
+from src.api.v1 import metrics
 from src.api.v1 import orders
+from src.api.v1 import realtime
 from src.api.v1 import recipes
 from src.api.v1 import storage
+from src.core.config import get_config
+from src.services.alert_scheduler import alert_scheduler
+from src.services.change_feed import change_feed
+from src.services.dashboard_summary import dashboard_summary
+from src.services.read_cache import read_cache
+from src.services.resilience import CircuitOpenError, resilience
 
-app = FastAPI(title="O-Platy-60")
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli est optionnel, gzip reste disponible
+    BrotliMiddleware = None
+
+config = get_config()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    resilience.configure(config)
+    read_cache.configure(config)
+    change_feed.add_listener(read_cache.on_change)
+    if config.ALERTS_ENABLED:
+        alert_scheduler.start(config)
+    dashboard_summary.start(config)
+    await change_feed.start(config)
+    yield
+    await change_feed.stop()
+    await dashboard_summary.stop()
+    await alert_scheduler.stop()
+
+
+app = FastAPI(title="O-Platy-60", lifespan=lifespan)
+
+
+def upstream_unavailable(exc: CircuitOpenError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(round(exc.retry_after))},
+    )
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return upstream_unavailable(exc)
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_error_handler(request: Request, exc: StarletteHTTPException):
+    # Les routes transforment toute erreur en 500 : un disjoncteur ouvert
+    # redevient un 503 pour que les clients sachent qu'ils peuvent réessayer
+    if isinstance(exc.__context__, CircuitOpenError):
+        return upstream_unavailable(exc.__context__)
+    return await http_exception_handler(request, exc)
+
+
+# Allers-retours Supabase par requête : Server-Timing, N+1, budgets
+app.add_middleware(RoundTripMiddleware, config=config)
+
+# Profil statistique des requêtes marquées X-Profile ou échantillonnées
+app.add_middleware(ProfilingMiddleware, config=config)
+
+# Concurrence bornée, écritures critiques prioritaires, 503 rapide au-delà
+app.add_middleware(AdmissionControlMiddleware, config=config)
+
+# Idempotency-Key : une écriture réessayée rejoue sa première réponse
+if config.IDEMPOTENCY_ENABLED:
+    app.add_middleware(IdempotencyMiddleware, config=config)
+
+# Les GET identiques simultanés partagent un seul appel amont
+app.add_middleware(SingleFlightMiddleware)
+
+# Compression des réponses volumineuses (brotli si disponible, sinon gzip)
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=config.COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=config.COMPRESSION_MIN_SIZE)
 
 app.include_router(auth.router)
+app.include_router(dashboard.router)
 app.include_router(ingredients.router)
+app.include_router(metrics.router)
 app.include_router(orders.router)
+app.include_router(realtime.router)
 app.include_router(recipes.router)
 app.include_router(storage.router)
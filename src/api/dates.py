@@ -0,0 +1,12 @@
+from datetime import datetime
+
+
+def parse_date(value: str) -> datetime | None:
+    """Interprète une date libre (« hier », « 2024-05-01 »…) avec dateparser.
+
+    dateparser est importé au premier appel : son chargement coûte cher et
+    ralentirait le démarrage de chaque worker pour deux filtres optionnels.
+    """
+    from dateparser import parse
+
+    return parse(value)
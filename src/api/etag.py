@@ -0,0 +1,80 @@
+import hashlib
+import json
+from typing import Any
+
+from fastapi import HTTPException, Request, Response, status as http_status
+
+
+def _versions(
+    rows: list[dict[str, Any]], key: str, embedded: str | None = None
+) -> list[list[Any]]:
+    """Projection (clé, last_updated[, last_updated embarqué]) d'une liste de lignes"""
+    versions = []
+    for row in rows:
+        version = [row.get(key), row.get("last_updated")]
+        if embedded:
+            version.append((row.get(embedded) or {}).get("last_updated"))
+        versions.append(version)
+    return versions
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(
+        json.dumps(parts, default=str, sort_keys=True).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def row_etag(
+    resource: str, row: dict[str, Any], key: str, embedded: str | None = None
+) -> str:
+    """ETag d'une ressource, dérivé de son last_updated"""
+    return make_etag(resource, _versions([row], key, embedded))
+
+
+def list_etag(
+    resource: str,
+    filters: dict[str, Any],
+    result: dict[str, Any] | None,
+    key: str,
+    embedded: str | None = None,
+) -> str:
+    """ETag d'une page de liste : filtres, total et versions des lignes de la page"""
+    if not result:
+        return make_etag(resource, filters, None)
+    pagination = result.get("pagination") or result.get("requests") or {}
+    return make_etag(
+        resource,
+        filters,
+        pagination.get("total"),
+        _versions(result["data"], key, embedded),
+    )
+
+
+def _header_etags(value: str | None, weak: bool = False) -> set[str]:
+    if not value:
+        return set()
+    etags = {x.strip() for x in value.split(",")}
+    # If-None-Match utilise la comparaison faible, If-Match la comparaison forte
+    return {x.removeprefix("W/") for x in etags} if weak else etags
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    etags = _header_etags(request.headers.get("if-none-match"), weak=True)
+    return "*" in etags or etag in etags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=http_status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+    )
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """Contrôle de concurrence optimiste sur les PUT"""
+    etags = _header_etags(request.headers.get("if-match"))
+    if etags and "*" not in etags and etag not in etags:
+        raise HTTPException(
+            status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+            detail="La ressource a été modifiée entre-temps",
+        )
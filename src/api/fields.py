@@ -0,0 +1,42 @@
+from fastapi import HTTPException, status as http_status
+
+
+def build_select(
+    fields: str | None,
+    allowed: set[str],
+    default: str,
+    required: tuple[str, ...] = (),
+) -> str:
+    """Traduit ``fields=a,b,embedded.c`` en select PostgREST ``a,b,embedded(c)``.
+
+    Seuls les champs de ``allowed`` sont acceptés ; ceux de ``required`` sont
+    toujours ajoutés (les champs embarqués seulement si la ressource est demandée).
+    """
+    if not fields:
+        return default
+    columns: list[str] = []
+    embedded: dict[str, list[str]] = {}
+    for field in (x.strip() for x in fields.split(",")):
+        if not field:
+            continue
+        if field not in allowed:
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST,
+                detail=f"Champ non autorisé : {field}",
+            )
+        resource, _, column = field.partition(".")
+        target = embedded.setdefault(resource, []) if column else columns
+        value = column or field
+        if value not in target:
+            target.append(value)
+
+    for field in required:
+        resource, _, column = field.partition(".")
+        if not column:
+            if field not in columns:
+                columns.append(field)
+        elif resource in embedded and column not in embedded[resource]:
+            embedded[resource].append(column)
+
+    parts = columns + [f"{k}({','.join(v)})" for k, v in embedded.items()]
+    return ",".join(parts)
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from src.api.route_match import route_key
+from src.core import metrics
+from src.core.config import Config, get_config
+
+# Écritures que les clients réessaient après une coupure réseau
+IDEMPOTENT_ROUTES = {
+    "POST /api/v1/ingredients/adjust",
+    "POST /api/v1/orders/",
+    "POST /api/v1/recipes/",
+}
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class _StoredResponse:
+    fingerprint: str
+    messages: list[dict[str, Any]]
+    stored_at: float
+
+
+class IdempotencyMiddleware:
+    """Rejoue la réponse d'une écriture déjà faite avec la même Idempotency-Key.
+
+    La clé est propre à l'appelant (en-tête Authorization) et à la route. Une
+    requête qui arrive pendant l'exécution de la première attend son résultat
+    au lieu de refaire l'écriture. Seules les réponses 2xx sont conservées :
+    après une erreur (422, 409, 5xx…) le client peut corriger et réessayer
+    avec la même clé. Réutiliser une clé avec un autre corps renvoie un 422.
+    Le stockage est local au process, borné en nombre et en durée :
+    ``main.py`` refuse donc de démarrer plusieurs workers quand il est actif.
+    """
+
+    def __init__(self, app: Any, config: Config | None = None) -> None:
+        config = config or get_config()
+        self.app = app
+        self.max_keys = config.IDEMPOTENCY_MAX_KEYS
+        self.ttl = config.IDEMPOTENCY_TTL_SECONDS
+        self._responses: OrderedDict[tuple, _StoredResponse] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.stats = {"stored": 0, "replayed": 0, "waited": 0, "mismatched": 0}
+        metrics.register("idempotency", self.snapshot)
+
+    def snapshot(self) -> dict[str, int]:
+        return {
+            **self.stats,
+            "keys": len(self._responses),
+            "inflight": len(self._inflight),
+        }
+
+    def _lookup(self, key: tuple) -> _StoredResponse | None:
+        # Même durée de vie pour toutes les clés : les plus anciennes sont devant
+        now = time.monotonic()
+        while self._responses:
+            oldest = next(iter(self._responses.values()))
+            if now - oldest.stored_at < self.ttl:
+                break
+            self._responses.popitem(last=False)
+        return self._responses.get(key)
+
+    def _store(
+        self, key: tuple, fingerprint: str, messages: list[dict[str, Any]]
+    ) -> None:
+        self._responses[key] = _StoredResponse(fingerprint, messages, time.monotonic())
+        while len(self._responses) > self.max_keys:
+            self._responses.popitem(last=False)
+        self.stats["stored"] += 1
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        route = route_key(scope) if idempotency_key is not None else None
+        if route not in IDEMPOTENT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._respond(send, 400, "En-tête Idempotency-Key invalide")
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = (route, headers.get(b"authorization", b""), idempotency_key)
+
+        while True:
+            stored = self._lookup(key)
+            if stored is not None:
+                await self._replay(stored, fingerprint, send)
+                return
+            leader = self._inflight.get(key)
+            if leader is None:
+                break
+            self.stats["waited"] += 1
+            await asyncio.shield(leader)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        messages: list[dict[str, Any]] = []
+
+        async def capture(message: dict[str, Any]) -> None:
+            messages.append(message)
+            await send(message)
+
+        try:
+            await self.app(scope, self._body_receive(body, receive), capture)
+        finally:
+            # Conservée même si le client est parti : c'est lui qui va réessayer
+            if _complete(messages) and 200 <= messages[0]["status"] < 300:
+                self._store(key, fingerprint, messages)
+            self._inflight.pop(key, None)
+            future.set_result(None)
+
+    async def _replay(
+        self, stored: _StoredResponse, fingerprint: str, send: Any
+    ) -> None:
+        if stored.fingerprint != fingerprint:
+            self.stats["mismatched"] += 1
+            await self._respond(
+                send, 422, "Idempotency-Key déjà utilisée pour une autre requête"
+            )
+            return
+        self.stats["replayed"] += 1
+        start, *rest = stored.messages
+        await send(
+            {
+                **start,
+                "headers": [*start["headers"], (b"idempotent-replayed", b"true")],
+            }
+        )
+        for message in rest:
+            await send(message)
+
+    @staticmethod
+    async def _read_body(receive: Any) -> bytes | None:
+        """Corps complet de la requête, ou None si le client s'est déconnecté"""
+        chunks: list[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _body_receive(body: bytes, receive: Any) -> Any:
+        consumed = False
+
+        async def replay() -> dict[str, Any]:
+            nonlocal consumed
+            if consumed:
+                return await receive()
+            consumed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return replay
+
+    async def _respond(self, send: Any, status: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def _complete(messages: list[dict[str, Any]]) -> bool:
+    """La réponse a été entièrement produite par la route"""
+    return (
+        bool(messages)
+        and messages[0]["type"] == "http.response.start"
+        and messages[-1]["type"] == "http.response.body"
+        and not messages[-1].get("more_body", False)
+    )
@@ -0,0 +1,165 @@
+import asyncio
+import hmac
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any
+
+from src.api.route_match import match_route
+from src.core.config import Config, get_config
+
+logger = logging.getLogger(__name__)
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """Profileur statistique limité aux threads qui exécutent une route.
+
+    Un thread relève toutes les ``interval`` secondes les piles de tous les
+    threads et ne garde que celles qui passent par le code de l'endpoint,
+    ce qui couvre les routes sync (threadpool) comme async (boucle). Des
+    requêtes simultanées sur la même route apparaissent dans le même profil.
+    """
+
+    def __init__(self, target: CodeType, interval: float = 0.005) -> None:
+        self.target = target
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame)
+                    frame = frame.f_back
+                # La pile est gardée à partir de l'endpoint
+                for depth in range(len(stack) - 1, -1, -1):
+                    if stack[depth].f_code is self.target:
+                        self.samples[
+                            tuple(_label(x) for x in reversed(stack[: depth + 1]))
+                        ] += 1
+                        break
+
+    def folded(self) -> str:
+        """Format « piles repliées » lu par flamegraph.pl et speedscope"""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.samples.items()
+        )
+
+
+class ProfilingMiddleware:
+    """Profile une requête sur demande (X-Profile) ou par échantillonnage.
+
+    Le profil est écrit dans ``PROFILE_DIR`` sous forme de piles repliées,
+    nommé par date, route et identifiant de requête ; seuls les
+    ``PROFILE_MAX_FILES`` plus récents sont conservés. Les requêtes non
+    profilées ne paient qu'un test d'en-tête.
+    """
+
+    def __init__(self, app: Any, config: Config | None = None) -> None:
+        config = config or get_config()
+        self.app = app
+        self.token = config.PROFILE_TOKEN
+        self.sample_rate = config.PROFILE_SAMPLE_RATE
+        self.sample_routes = {
+            x.strip() for x in config.PROFILE_SAMPLE_ROUTES.split(",") if x.strip()
+        }
+        self.directory = Path(config.PROFILE_DIR)
+        self.max_files = config.PROFILE_MAX_FILES
+
+    def _requested(self, scope: dict[str, Any]) -> bool:
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                # Comparaison en octets : un en-tête non ASCII ne lève pas
+                return hmac.compare_digest(value, self.token.encode())
+        return False
+
+    def _sampled(self, key: str) -> bool:
+        if self.sample_rate <= 0:
+            return False
+        if self.sample_routes and key not in self.sample_routes:
+            return False
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not requested and self.sample_rate <= 0:
+            await self.app(scope, receive, send)
+            return
+        route = match_route(scope)
+        endpoint = getattr(route, "endpoint", None)
+        key = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+        if endpoint is None or not (requested or self._sampled(key)):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (v.decode() for k, v in scope["headers"] if k == b"x-request-id"),
+            uuid.uuid4().hex,
+        )
+        # L'identifiant finit dans un nom de fichier
+        request_id = re.sub(r"[^A-Za-z0-9-]+", "", request_id)[:64] or uuid.uuid4().hex
+
+        async def send_with_id(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", request_id.encode())
+                ]
+            await send(message)
+
+        sampler = StackSampler(endpoint.__code__)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            await asyncio.to_thread(self._save, sampler, key, request_id, elapsed)
+
+    def _save(
+        self, sampler: StackSampler, key: str, request_id: str, elapsed: float
+    ) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            route = re.sub(r"[^A-Za-z0-9]+", "_", key).strip("_")
+            name = f"{datetime.now():%Y%m%dT%H%M%S}_{route}_{request_id}.folded"
+            (self.directory / name).write_text(sampler.folded())
+            logger.info("Profiled %s in %.0f ms -> %s", key, elapsed * 1000, name)
+            profiles = sorted(
+                self.directory.glob("*.folded"), key=lambda x: x.stat().st_mtime
+            )
+            for old in profiles[: max(len(profiles) - self.max_files, 0)]:
+                old.unlink(missing_ok=True)
+        except OSError:
+            logger.exception("Could not write profile for %s", key)
@@ -0,0 +1,122 @@
+import json
+import logging
+from typing import Any, Callable, TypeVar
+
+from src.api.route_match import match_route
+from src.core import tracing
+from src.core.config import Config, get_config
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def round_trip_budget(limit: int) -> Callable[[F], F]:
+    """Déclare le nombre maximal d'appels Supabase attendus pour une route"""
+
+    def decorate(endpoint: F) -> F:
+        endpoint.__round_trip_budget__ = limit  # type: ignore[attr-defined]
+        return endpoint
+
+    return decorate
+
+
+class RoundTripMiddleware:
+    """Compte les appels PostgREST, RPC, auth et storage de chaque requête.
+
+    Le détail part dans l'en-tête ``Server-Timing`` et dans les logs ; les
+    requêtes semblables répétées (N+1) déclenchent un avertissement. Avec
+    ``ROUND_TRIP_BUDGET_MODE=enforce`` (tests), une route qui dépasse le
+    budget déclaré par ``round_trip_budget`` répond 500 au lieu de sa réponse.
+    """
+
+    def __init__(self, app: Any, config: Config | None = None) -> None:
+        config = config or get_config()
+        self.app = app
+        self.repeat_threshold = config.ROUND_TRIP_REPEAT_THRESHOLD
+        self.budget_mode = config.ROUND_TRIP_BUDGET_MODE
+
+    def _budget(self, scope: dict[str, Any]) -> int | None:
+        if self.budget_mode == "off":
+            return None
+        endpoint = getattr(match_route(scope), "endpoint", None)
+        return getattr(endpoint, "__round_trip_budget__", None)
+
+    def _server_timing(self, trace: tracing.RequestTrace) -> bytes:
+        return ", ".join(
+            f'{kind};dur={seconds * 1000:.1f};desc="{count} calls"'
+            for kind, (count, seconds) in trace.by_kind().items()
+        ).encode()
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api/v1/"):
+            await self.app(scope, receive, send)
+            return
+
+        trace = tracing.start_trace()
+        budget = self._budget(scope)
+        over_budget = False
+
+        async def send_with_timing(message: dict[str, Any]) -> None:
+            nonlocal over_budget
+            if message["type"] == "http.response.start":
+                over_budget = budget is not None and len(trace.calls) > budget
+                if over_budget and self.budget_mode == "enforce":
+                    body = json.dumps(
+                        {
+                            "detail": f"Budget d'allers-retours dépassé : "
+                            f"{len(trace.calls)} > {budget}",
+                            "round_trips": [x.label for x in trace.calls],
+                        }
+                    ).encode()
+                    await send(
+                        {
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [
+                                (b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                            ],
+                        }
+                    )
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                if trace.calls:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", self._server_timing(trace))
+                    ]
+            elif over_budget and self.budget_mode == "enforce":
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self._log(scope, trace, budget)
+
+    def _log(
+        self, scope: dict[str, Any], trace: tracing.RequestTrace, budget: int | None
+    ) -> None:
+        if not trace.calls:
+            return
+        request = f"{scope['method']} {scope['path']}"
+        logger.info(
+            "%s: %d round trips (%s)",
+            request,
+            len(trace.calls),
+            ", ".join(f"{x.label} {x.seconds * 1000:.0f}ms" for x in trace.calls),
+        )
+        repeated = trace.repeated(self.repeat_threshold)
+        if repeated:
+            logger.warning(
+                "%s: repeated similar queries, possible N+1: %s",
+                request,
+                ", ".join(f"{label} x{n}" for label, n in repeated.items()),
+            )
+        if budget is not None and len(trace.calls) > budget:
+            logger.warning(
+                "%s: %d round trips exceed budget of %d",
+                request,
+                len(trace.calls),
+                budget,
+            )
@@ -0,0 +1,19 @@
+from typing import Any
+
+from starlette.routing import BaseRoute, Match
+
+
+def match_route(scope: dict[str, Any]) -> BaseRoute | None:
+    """Route qui traitera la requête, résolue avant le routage (middlewares)"""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def route_key(scope: dict[str, Any]) -> str:
+    """« MÉTHODE /chemin/{param} », ou le chemin brut si aucune route ne correspond"""
+    route = match_route(scope)
+    path = getattr(route, "path", None) or scope["path"]
+    return f"{scope['method']} {path}"
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Any
+from urllib.parse import parse_qsl, urlencode
+
+from src.core import metrics
+
+# En-têtes qui changent la réponse et font donc partie de la clé
+KEY_HEADERS = (b"authorization", b"if-none-match", b"accept")
+
+
+class SingleFlightMiddleware:
+    """Fusionne les GET identiques simultanés en un seul appel amont.
+
+    La clé est le chemin, les paramètres de requête triés et les en-têtes qui
+    influencent la réponse. La première requête exécute la route ; celles qui
+    arrivent pendant son exécution rejouent ses messages de réponse, corps
+    sérialisé compris. Si la première échoue, les suivantes s'exécutent seules.
+    """
+
+    def __init__(self, app: Any, prefixes: tuple[str, ...] = ("/api/v1/",)) -> None:
+        self.app = app
+        self.prefixes = prefixes
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+        metrics.register("singleflight", lambda: dict(self.stats))
+
+    def _key(self, scope: dict[str, Any]) -> tuple:
+        query = sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        headers = tuple(
+            (name, value) for name, value in scope["headers"] if name in KEY_HEADERS
+        )
+        return (scope["path"], urlencode(query), tuple(sorted(headers)))
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = self._key(scope)
+        leader = self._inflight.get(key)
+        if leader is not None:
+            self.stats["coalesced"] += 1
+            messages = await asyncio.shield(leader)
+            if messages is None:
+                await self.app(scope, receive, send)
+                return
+            for message in messages:
+                await send(message)
+            return
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.stats["leaders"] += 1
+        messages: list[dict[str, Any]] = []
+
+        async def capture(message: dict[str, Any]) -> None:
+            messages.append(message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            future.set_result(None)
+            raise
+        else:
+            future.set_result(messages)
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,13 @@
+from fastapi import Response
+
+from src.services.read_cache import CachedRead
+
+
+def mark_staleness(response: Response, cached: CachedRead) -> None:
+    """Signale l'âge d'une réponse servie par le cache de lecture"""
+    if cached.age:
+        response.headers["Age"] = str(int(cached.age))
+    if cached.refresh_failed:
+        response.headers["Warning"] = '111 - "Revalidation Failed"'
+    elif cached.stale:
+        response.headers["Warning"] = '110 - "Response is Stale"'
@@ -18,7 +18,7 @@ def login(
     except AuthInvalidCredentialsError as e:
         raise HTTPException(status_code=400, detail=f"Invalid credentials - {e}")
     except Exception as e:
-        raise HTTPException(status_code=505, detail=f"Server Error - {e}")
+        raise HTTPException(status_code=500, detail=f"Server Error - {e}")
 
 
 @router.post("/refresh", response_model=auth_schema.Session)
@@ -32,7 +32,7 @@ def refresh(
     except AuthInvalidCredentialsError as e:
         raise HTTPException(status_code=400, detail=f"Invalid credentials - {e}")
     except Exception as e:
-        raise HTTPException(status_code=505, detail=f"Server Error - {e}")
+        raise HTTPException(status_code=500, detail=f"Server Error - {e}")
 
 
 @router.post("/logout")
@@ -43,4 +43,4 @@ def logout(token: auth_schema.Token, supabase: SupabaseService = supabase_depend
     except AuthInvalidCredentialsError as e:
         raise HTTPException(status_code=400, detail=f"Invalid credentials - {e}")
     except Exception as e:
-        raise HTTPException(status_code=505, detail=f"Server Error - {e}")
+        raise HTTPException(status_code=500, detail=f"Server Error - {e}")
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, status as http_status
+from src.services.dashboard_summary import dashboard_summary
+
+router = APIRouter(prefix="/api/v1/dashboard", tags=["Dashboard"])
+
+
+@router.get("/summary")
+def get_summary():
+    """Résumé du tableau de bord servi depuis les agrégats en mémoire"""
+    try:
+        return dashboard_summary.snapshot()
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors du calcul du résumé - {e}",
+        )
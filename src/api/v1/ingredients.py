@@ -1,42 +1,118 @@
+import asyncio
+import contextvars
 import json
-from fastapi import APIRouter, HTTPException, Path, status as http_status
-from src.schemas.ingredients_schema import Ingredient, Stock_Adjustment
-from src.api.dependencies import ingredient_depends
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    status as http_status,
+)
+from src.api.dates import parse_date
+from src.api.fields import build_select
+from src.api.round_trips import round_trip_budget
+from src.api.staleness import mark_staleness
+from src.api.etag import (
+    check_if_match,
+    is_not_modified,
+    list_etag,
+    not_modified,
+    row_etag,
+)
+from src.schemas.ingredients_schema import (
+    AdjustmentType,
+    HistoryInterval,
+    Ingredient,
+    Stock_Adjustment,
+    Stock_Count,
+)
+from src.api.dependencies import ingredient_depends, order_depends
+from src.services.read_cache import read_cache
 from src.services.supabase_services.ingredient_service import IngredientService
+from src.services.supabase_services.order_service import OrdersService
 from typing import Any, Dict, Optional
 
+# Colonnes suffisantes pour calculer un ETag sans charger les lignes complètes
+VERSION_COLUMNS = "sku, last_updated"
+# Champs autorisés pour fields=
+INGREDIENT_FIELDS = set(Ingredient.model_fields)
+# Délai maximal d'une section de /overview avant de la déclarer en erreur
+OVERVIEW_SECTION_TIMEOUT = 5.0
+# Threads dédiés aux sections de /overview : une section abandonnée continue
+# de bloquer sur Supabase, mais sans occuper le threadpool des routes sync
+OVERVIEW_WORKERS = 8
+overview_executor = ThreadPoolExecutor(
+    max_workers=OVERVIEW_WORKERS, thread_name_prefix="overview"
+)
+
 router = APIRouter(prefix="/api/v1/ingredients", tags=["Ingredients"])
 
 
 # GET /ingredients
 @router.get("/", response_model=dict)
+@round_trip_budget(2)
 def get_ingredients(
+    request: Request,
+    response: Response,
     page: int = 1,
     limit: int = 10,
     search: str | None = None,
     category: str | None = None,
     status: str | None = None,
     low_stock_only: bool | None = False,
+    fields: str | None = None,
     ingredient_service: IngredientService = ingredient_depends,
 ):
     """
     Récupère la liste des ingrédients (delete=False) avec pagination et filtres optionnels.
     """
     try:
-        result = ingredient_service.get_ingredients(
-            page=page,
-            limit=limit,
-            search=search,
-            category=category,
-            status=status,
-            low_stock_only=low_stock_only,
+        columns = build_select(
+            fields, INGREDIENT_FIELDS, "*", required=("sku", "last_updated")
         )
+        filters = {
+            "page": page,
+            "limit": limit,
+            "search": search,
+            "category": category,
+            "status": status,
+            "low_stock_only": low_stock_only,
+        }
+        cached = None
+        if read_cache.enabled("ingredients"):
+            # Le cache sert la dernière réponse connue, même si Supabase est lent
+            cached = read_cache.get(
+                "ingredients",
+                (tuple(filters.items()), columns),
+                lambda: ingredient_service.get_ingredients(**filters, columns=columns),
+            )
+        elif request.headers.get("if-none-match"):
+            versions = ingredient_service.get_ingredients(
+                **filters, columns=VERSION_COLUMNS
+            )
+            etag = list_etag("ingredients", [filters, columns], versions, "sku")
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+
+        if cached is not None:
+            result = cached.value
+        else:
+            result = ingredient_service.get_ingredients(**filters, columns=columns)
 
         if not result:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
                 detail="Aucun ingrédient trouvé.",
             )
+        etag = list_etag("ingredients", [filters, columns], result, "sku")
+        if cached is not None:
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+            mark_staleness(response, cached)
+        response.headers["ETag"] = etag
         return result
     except HTTPException:
         raise
@@ -49,15 +125,36 @@ def get_ingredients(
 
 # GET /ingredients/{sku}
 @router.get("/{sku}", response_model=Ingredient)
+@round_trip_budget(2)
 def get_ingredient(
     sku: str,
+    request: Request,
+    response: Response,
     service: IngredientService = ingredient_depends,
 ):
     """Détails d’un ingrédient"""
     try:
-        ingredient = service.get_ingredient(sku)
+        cached = None
+        if read_cache.enabled("ingredient"):
+            cached = read_cache.get(
+                "ingredient", sku, lambda: service.get_ingredient(sku)
+            )
+        elif request.headers.get("if-none-match"):
+            version = service.get_ingredient(sku, columns=VERSION_COLUMNS)
+            if version:
+                etag = row_etag("ingredient", version, "sku")
+                if is_not_modified(request, etag):
+                    return not_modified(etag)
+
+        ingredient = cached.value if cached is not None else service.get_ingredient(sku)
         if not ingredient:
             raise HTTPException(status_code=404, detail="Ingredient not found")
+        etag = row_etag("ingredient", ingredient, "sku")
+        if cached is not None:
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+            mark_staleness(response, cached)
+        response.headers["ETag"] = etag
         return ingredient
     except HTTPException:
         raise
@@ -91,13 +188,29 @@ def create_ingredient(
 def update_ingredient(
     sku: str,
     ingredient_data: Dict[str, Any],
+    request: Request,
+    response: Response,
     service: IngredientService = ingredient_depends,
 ):
     """Mettre à jour un ingrédient"""
     try:
-        updated = service.update_ingredient(sku, ingredient_data)
+        # If-Match : l'écriture n'a lieu que si last_updated n'a pas bougé
+        version = None
+        if request.headers.get("if-match"):
+            version = service.get_ingredient(sku, columns=VERSION_COLUMNS)
+            if not version:
+                raise HTTPException(status_code=404, detail="Ingredient not found")
+            check_if_match(request, row_etag("ingredient", version, "sku"))
+
+        updated = service.update_ingredient(sku, ingredient_data, version=version)
+        if not updated and version is not None:
+            raise HTTPException(
+                status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+                detail="La ressource a été modifiée entre-temps",
+            )
         if not updated:
             raise HTTPException(status_code=404, detail="Ingredient not found")
+        response.headers["ETag"] = row_etag("ingredient", updated, "sku")
         return updated
     except HTTPException:
         raise
@@ -140,15 +253,81 @@ def adjust_stock(
         raise HTTPException(status_code=500, detail=f"Server Error - {e}")
 
 
+@router.post("/stock-count")
+@round_trip_budget(2)
+def record_stock_count(
+    count: Stock_Count,
+    dry_run: bool = False,
+    service: IngredientService = ingredient_depends,
+):
+    """Inventaire complet : rapport d'écarts et mise à jour du stock"""
+    try:
+        count_dict = json.loads(count.model_dump_json())
+        return service.record_stock_count(
+            count_dict["lines"],
+            count_dict["counted_by"],
+            count_dict["notes"],
+            dry_run=dry_run,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        # Le stock a bougé entre la lecture et l'écriture : rien n'a été écrit
+        if getattr(e, "code", None) == "40001":
+            raise HTTPException(
+                status_code=http_status.HTTP_409_CONFLICT,
+                detail=f"Stock modifié pendant l'inventaire, recommencer - {e}",
+            )
+        raise HTTPException(status_code=500, detail=f"Server Error - {e}")
+
+
 # GET /ingredients/history/{sku}
 @router.get("/{sku}/history")
+@round_trip_budget(2)
 def get_history(
     sku: str = Path(...),
+    cursor: str | None = None,
+    limit: int = 50,
+    adjustment_type: AdjustmentType | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    interval: HistoryInterval | None = None,
     service: IngredientService = ingredient_depends,
 ):
-    """Historique des mouvements (placeholder)"""
+    """Historique des mouvements, brut (curseur) ou agrégé par intervalle"""
     try:
-        return service.get_history(sku)
+        # Interprétation des dates texte -> ISO format
+        start_node = parse_date(start) if start else None
+        end_node = parse_date(end) if end else None
+        if (start and start_node is None) or (end and end_node is None):
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST,
+                detail="Date de début ou de fin illisible",
+            )
+        start = start_node.isoformat() if start_node else None
+        end = end_node.isoformat() if end_node else None
+        type_value = adjustment_type.value if adjustment_type else None
+
+        if interval:
+            return service.get_history_aggregate(
+                sku,
+                interval=interval.value,
+                adjustment_type=type_value,
+                start=start,
+                end=end,
+            )
+        return service.get_history(
+            sku,
+            cursor=cursor,
+            limit=limit,
+            adjustment_type=type_value,
+            start=start,
+            end=end,
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server Error - {e}")
 
@@ -157,17 +336,100 @@ def get_history(
 @router.get("/{sku}/batches")
 def get_batches(
     sku: str,
+    expiring_within_days: int | None = None,
     service: IngredientService = ingredient_depends,
 ):
-    """Lots groupés par date d’expiration (placeholder)"""
+    """Lots ouverts triés par date d’expiration (FEFO)"""
     try:
-        return service.get_batches(sku)
+        return service.get_batches(sku, expiring_within_days)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server Error - {e}")
 
 
+# GET /ingredients/{sku}/forecast
+@router.get("/{sku}/forecast")
+def get_forecast(
+    sku: str,
+    horizon_days: int = Query(30, ge=1, le=365),
+    service: IngredientService = ingredient_depends,
+):
+    """Prévision de consommation et date de rupture projetée"""
+    try:
+        forecast = service.get_forecast(sku, horizon_days)
+        if forecast is None:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+        return forecast
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server Error - {e}")
+
+
+# GET /ingredients/{sku}/overview
+@router.get("/{sku}/overview")
+@round_trip_budget(6)
+async def get_overview(
+    sku: str,
+    history_limit: int = 20,
+    orders_limit: int = 10,
+    service: IngredientService = ingredient_depends,
+    order_service: OrdersService = order_depends,
+):
+    """Fiche complète d'un ingrédient en un seul appel.
+
+    Les sections sont chargées en parallèle ; une section en échec vaut
+    null et son erreur est reportée dans ``errors`` sans faire échouer le reste.
+    """
+    loaders = {
+        "ingredient": lambda: service.get_ingredient(sku),
+        "recipes": lambda: service.get_recipes(sku),
+        "orders": lambda: order_service.get_ingredient_orders(
+            sku, "descending", orders_limit
+        ),
+        "history": lambda: service.get_history(sku, limit=history_limit),
+        "batches": lambda: service.get_batches(sku),
+    }
+    loop = asyncio.get_running_loop()
+    # Copie du contexte pour garder la trace des allers-retours Supabase ; une
+    # section encore en file à l'expiration du délai n'est jamais lancée
+    results = await asyncio.gather(
+        *(
+            asyncio.wait_for(
+                loop.run_in_executor(
+                    overview_executor, contextvars.copy_context().run, load
+                ),
+                OVERVIEW_SECTION_TIMEOUT,
+            )
+            for load in loaders.values()
+        ),
+        return_exceptions=True,
+    )
+
+    overview: dict[str, Any] = {"sku": sku}
+    errors: dict[str, str] = {}
+    for name, result in zip(loaders, results):
+        if isinstance(result, asyncio.TimeoutError):
+            overview[name] = None
+            errors[name] = "Délai dépassé"
+        elif isinstance(result, Exception):
+            # .single() sans ligne : l'ingrédient n'existe pas
+            if name == "ingredient" and getattr(result, "code", None) == "PGRST116":
+                raise HTTPException(status_code=404, detail="Ingredient not found")
+            overview[name] = None
+            errors[name] = str(result)
+        else:
+            overview[name] = result
+    if len(errors) == len(loaders):
+        raise HTTPException(
+            status_code=500, detail=f"Server Error - {errors['ingredient']}"
+        )
+    overview["errors"] = errors
+    return overview
+
+
 # SEARCH INGREDIENTS
 @router.get("/search/{keyword}")
+@round_trip_budget(1)
 def search_ingredients(
     keyword: str,
     service: IngredientService = ingredient_depends,
@@ -184,6 +446,7 @@ def search_ingredients(
 
 # GET RECIPES
 @router.get("/recipes/{sku}")
+@round_trip_budget(1)
 def get_recipes(
     sku: str,
     service: IngredientService = ingredient_depends,
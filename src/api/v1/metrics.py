@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from src.core import metrics
+
+router = APIRouter(prefix="/api/v1/metrics", tags=["Metrics"])
+
+
+@router.get("/")
+def get_metrics():
+    """Compteurs internes (coalescence, ...)"""
+    return metrics.collect()
@@ -1,44 +1,95 @@
 import json
-from dateparser import parse as parse_date
+from datetime import datetime, timedelta
 from typing import Any
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from src.api.dates import parse_date
+from src.api.fields import build_select
+from src.api.round_trips import round_trip_budget
+from src.api.staleness import mark_staleness
+from src.api.etag import (
+    check_if_match,
+    is_not_modified,
+    list_etag,
+    not_modified,
+    row_etag,
+)
 from src.schemas import order_schema
 from src.schemas.global_schema import Sort
+from src.schemas.ingredients_schema import Ingredient
 from src.schemas.order_schema import OrderStatusEnum
+from src.services.read_cache import read_cache
+from src.services.supabase_services.ingredient_service import IngredientService
 from src.services.supabase_services.order_service import OrdersService
-from src.api.dependencies import order_depends
+from src.api.dependencies import ingredient_depends, order_depends
 from fastapi import status as http_status
 
+# Colonnes suffisantes pour calculer un ETag, ingrédient embarqué compris
+VERSION_COLUMNS = "id, last_updated, ingredients(last_updated)"
+# Champs autorisés pour fields=, y compris ceux de l'ingrédient embarqué
+ORDER_FIELDS = (set(order_schema.ORDER.model_fields) - {"ingredients"}) | {
+    f"ingredients.{x}" for x in Ingredient.model_fields
+}
+# SQLSTATE des erreurs métier de la RPC receive_orders -> statut HTTP
+RECEIVE_ERROR_STATUS = {
+    "P0002": http_status.HTTP_404_NOT_FOUND,
+    "55000": http_status.HTTP_409_CONFLICT,
+}
+
 router = APIRouter(prefix="/api/v1/orders", tags=["Orders"])
 
 
 @router.get("/")
+@round_trip_budget(2)
 def get_orders(
+    request: Request,
+    response: Response,
     page: int = 1,
     limit: int = 20,
     status: OrderStatusEnum | None = None,
     ingredient_id: str | None = None,
     created_at: str | None = None,
     completed_at: str | None = None,
+    fields: str | None = None,
     orders_service: OrdersService = order_depends,
 ):
     """Récupère la liste des commandes avec filtres et pagination"""
     try:
+        columns = build_select(
+            fields,
+            ORDER_FIELDS,
+            "*, ingredients(*)",
+            required=("id", "last_updated", "ingredients.last_updated"),
+        )
+        # L'ingrédient embarqué ne compte dans l'ETag que s'il est renvoyé
+        embedded = "ingredients" if "ingredients(" in columns else None
+        version_columns = VERSION_COLUMNS if embedded else "id, last_updated"
         # Interprétation des dates texte -> ISO format
         created_at_node = parse_date(created_at) if created_at else None
         completed_at_node = parse_date(completed_at) if completed_at else None
         created_at = created_at_node.isoformat() if created_at_node else None
         completed_at = completed_at_node.isoformat() if completed_at_node else None
 
-        result = orders_service.get_orders(
-            status=status.value if status else None,
-            ingredient_id=ingredient_id,
-            created_at=created_at,
-            completed_at=completed_at,
-            page=page,
-            limit=limit,
+        filters = {
+            "status": status.value if status else None,
+            "ingredient_id": ingredient_id,
+            "created_at": created_at,
+            "completed_at": completed_at,
+            "page": page,
+            "limit": limit,
+        }
+        if request.headers.get("if-none-match"):
+            versions = orders_service.get_orders(**filters, columns=version_columns)
+            etag = list_etag("orders", [filters, columns], versions, "id", embedded)
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+
+        result = orders_service.get_orders(**filters, columns=columns)
+        response.headers["ETag"] = list_etag(
+            "orders", [filters, columns], result, "id", embedded
         )
         return result
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -74,19 +125,125 @@ def create_order(
         )
 
 
+def _day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@router.get("/analytics")
+@round_trip_budget(1)
+def get_order_analytics(
+    response: Response,
+    start: str | None = None,
+    end: str | None = None,
+    period: order_schema.AnalyticsPeriod = order_schema.AnalyticsPeriod.MONTH,
+    orders_service: OrdersService = order_depends,
+):
+    """Dépenses par période, catégorie et ingrédient, écarts de prix et quantités.
+
+    Bornes à la journée, ``end`` inclus. Par défaut : depuis le 1er janvier de
+    l'année en cours.
+    """
+    try:
+        start_node = parse_date(start) if start else None
+        end_node = parse_date(end) if end else None
+        if (start and start_node is None) or (end and end_node is None):
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST,
+                detail="Date de début ou de fin illisible",
+            )
+        if start_node is None:
+            start_node = datetime.now().replace(month=1, day=1)
+        # Tronquées au jour : « le mois dernier » ne crée pas une clé de cache
+        # par microseconde
+        start_node = _day(start_node)
+        end_node = _day(end_node) + timedelta(days=1) if end_node else None
+        window = (
+            start_node.isoformat(),
+            end_node.isoformat() if end_node else None,
+            period.value,
+        )
+        # Une entrée de cache par fenêtre, vidée à chaque écriture de commande
+        cached = read_cache.get(
+            "order_analytics", window, lambda: orders_service.get_analytics(*window)
+        )
+        mark_staleness(response, cached)
+        return cached.value
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors du calcul des analyses - {e}",
+        )
+
+
+@router.get("/suggestions")
+def get_reorder_suggestions(
+    window_days: int = Query(30, ge=1),
+    coverage_days: int = Query(7, ge=0),
+    default_lead_time_days: float = Query(2, ge=0),
+    orders_service: OrdersService = order_depends,
+):
+    """Suggestions de réapprovisionnement calculées sur tout le catalogue"""
+    try:
+        return orders_service.get_reorder_suggestions(
+            window_days=window_days,
+            coverage_days=coverage_days,
+            default_lead_time_days=default_lead_time_days,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors du calcul des suggestions - {e}",
+        )
+
+
+@router.post("/receive", response_model=list[order_schema.ORDER])
+def receive_orders(
+    receipt: order_schema.ReceiveOrders,
+    orders_service: OrdersService = order_depends,
+):
+    """Réceptionne plusieurs lignes de commande en un seul appel transactionnel"""
+    try:
+        receipt_dict = json.loads(receipt.model_dump_json())
+        return orders_service.receive_orders(
+            receipt_dict["lines"], receipt_dict["received_by"]
+        )
+    except Exception as e:
+        # Erreurs métier levées par la RPC, rien n'a été écrit
+        code = getattr(e, "code", None)
+        if code in RECEIVE_ERROR_STATUS:
+            raise HTTPException(status_code=RECEIVE_ERROR_STATUS[code], detail=str(e))
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors de la réception - {e}",
+        )
+
+
 @router.get("/{order_id}", response_model=order_schema.ORDER)
+@round_trip_budget(2)
 def get_order(
     order_id: int,
+    request: Request,
+    response: Response,
     orders_service: OrdersService = order_depends,  # type: ignore
 ):
     """Récupère les détails d'une commande par son ID"""
     try:
+        if request.headers.get("if-none-match"):
+            version = orders_service.get_order_by_id(order_id, VERSION_COLUMNS)
+            if version:
+                etag = row_etag("order", version, "id", "ingredients")
+                if is_not_modified(request, etag):
+                    return not_modified(etag)
+
         order = orders_service.get_order_by_id(order_id)
         if not order:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
                 detail="Commande non trouvée",
             )
+        response.headers["ETag"] = row_etag("order", order, "id", "ingredients")
         return order
     except HTTPException as e:
         raise e
@@ -101,16 +258,46 @@ def get_order(
 def update_order(
     order_id: int,
     update_data: dict[str, Any],
+    request: Request,
     orders_service: OrdersService = order_depends,
+    ingredient_service: IngredientService = ingredient_depends,
 ):
     """Met à jour une commande existante."""
     try:
-        order = orders_service.update_order(order_id, update_data)
+        # If-Match : l'écriture n'a lieu que si last_updated n'a pas bougé
+        version = None
+        if request.headers.get("if-match"):
+            version = orders_service.get_order_by_id(order_id, VERSION_COLUMNS)
+            if not version:
+                raise HTTPException(
+                    status_code=http_status.HTTP_404_NOT_FOUND,
+                    detail="Commande non trouvée",
+                )
+            check_if_match(request, row_etag("order", version, "id", "ingredients"))
+
+        # La date d'expiration appartient au lot, pas à la commande
+        expire_at = update_data.pop("expire_at", None)
+        order = orders_service.update_order(order_id, update_data, version=version)
+        if not order and version is not None:
+            raise HTTPException(
+                status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+                detail="La ressource a été modifiée entre-temps",
+            )
         if not order:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
                 detail="Commande non trouvée",
             )
+        # Une commande reçue crée un lot pour le suivi FEFO
+        if order["status"] == OrderStatusEnum.COMPLETED.value and order.get(
+            "quantity_received"
+        ):
+            ingredient_service.receive_batch(
+                order["ingredient_id"],
+                order["quantity_received"],
+                order_id=order["id"],
+                expire_at=expire_at,
+            )
         return order
     except HTTPException as e:
         raise e
@@ -148,6 +335,7 @@ def delete_order(
 
 
 @router.get("/ingredient/{sku}", response_model=list[order_schema.ORDER])
+@round_trip_budget(1)
 def get_ingredient_order(
     sku: str,
     sort: Sort,
@@ -0,0 +1,63 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from src.schemas.realtime_schema import Subscription
+from src.services.change_feed import change_feed
+
+router = APIRouter(prefix="/api/v1/realtime", tags=["Realtime"])
+
+
+async def _receive_subscriptions(websocket: WebSocket, subscriber) -> None:
+    """Lit les messages {"topics": [...], "filters": {topic: {champ: valeurs}}}"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(
+                message.get("code", status.WS_1000_NORMAL_CLOSURE)
+            )
+        try:
+            subscription = Subscription.model_validate_json(
+                message.get("text") or message.get("bytes") or ""
+            )
+        except ValidationError:
+            # Message illisible : la connexion est fermée, pas le serveur
+            await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+            return
+        subscriber.subscribe(subscription.topics, subscription.filters)
+        await websocket.send_json(
+            {"subscribed": sorted(subscriber.topics), "filters": subscription.filters}
+        )
+
+
+@router.websocket("/ws")
+async def change_stream(websocket: WebSocket):
+    """Pousse les changements d'ingredients, commandes et repats aux abonnés"""
+    await websocket.accept()
+    subscriber = change_feed.connect()
+    receiver = asyncio.create_task(_receive_subscriptions(websocket, subscriber))
+    try:
+        while True:
+            getter = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, receiver}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiver in done:
+                # Déconnexion (levée) ou fermeture pour message invalide
+                getter.cancel()
+                receiver.result()
+                return
+            message = getter.result()
+            if message is None:
+                code = (
+                    status.WS_1013_TRY_AGAIN_LATER
+                    if subscriber.overflowed
+                    else status.WS_1001_GOING_AWAY
+                )
+                await websocket.close(code=code)
+                return
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        change_feed.disconnect(subscriber)
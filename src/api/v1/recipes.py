@@ -1,33 +1,93 @@
 import json
 from typing import Any, List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from src.api.fields import build_select
+from src.api.round_trips import round_trip_budget
+from src.api.staleness import mark_staleness
+from src.api.etag import (
+    check_if_match,
+    is_not_modified,
+    list_etag,
+    not_modified,
+    row_etag,
+)
 from src.schemas import recipe_schema
 from src.api.dependencies import recipe_depends
 from fastapi import status as http_status
+from src.services.read_cache import read_cache
 from src.services.supabase_services.recipe_service import RecipeService
 
+# Colonnes suffisantes pour calculer un ETag sans charger les lignes complètes
+VERSION_COLUMNS = "id, last_updated"
+# Champs autorisés pour fields=
+RECIPE_FIELDS = set(recipe_schema.Recipe.model_fields)
+
 router = APIRouter(prefix="/api/v1/recipes", tags=["Recipes"])
 
 
 @router.get("/")
+@round_trip_budget(2)
 def get_recipes(
+    request: Request,
+    response: Response,
     search_query: str | None = None,
     active: bool | str = "all",
     category: str | None = None,
     page: int = 1,
     limit: int = 20,
+    include: str | None = None,
+    fields: str | None = None,
     recipe_service: RecipeService = recipe_depends,
 ):
     """Récupère la liste des repats avec filtres et pagination"""
     try:
-        result = recipe_service.get_recipes(
-            active=active,
-            search_query=search_query,
-            category=category,
-            page=page,
-            limit=limit,
+        columns = build_select(
+            fields, RECIPE_FIELDS, "*", required=("id", "last_updated")
         )
+        includes = {x.strip() for x in include.split(",")} if include else set()
+        filters = {
+            "active": active,
+            "search_query": search_query,
+            "category": category,
+            "page": page,
+            "limit": limit,
+        }
+        # Les ingredients embarqués n'ont pas de version dans la ligne de la repat
+        cacheable = "ingredients" not in includes
+        cached = None
+        if read_cache.enabled("recipes"):
+            cached = read_cache.get(
+                "recipes",
+                (tuple(filters.items()), columns, "ingredients" in includes),
+                lambda: recipe_service.get_recipes(
+                    **filters,
+                    include_ingredients="ingredients" in includes,
+                    columns=columns,
+                ),
+            )
+            mark_staleness(response, cached)
+        elif cacheable and request.headers.get("if-none-match"):
+            versions = recipe_service.get_recipes(**filters, columns=VERSION_COLUMNS)
+            etag = list_etag("recipes", [filters, columns], versions, "id")
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+
+        if cached is not None:
+            result = cached.value
+        else:
+            result = recipe_service.get_recipes(
+                **filters,
+                include_ingredients="ingredients" in includes,
+                columns=columns,
+            )
+        if cacheable:
+            etag = list_etag("recipes", [filters, columns], result, "id")
+            if cached is not None and is_not_modified(request, etag):
+                return not_modified(etag)
+            response.headers["ETag"] = etag
         return result
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -35,16 +95,84 @@ def get_recipes(
         )
 
 
+@router.post("/ingredients:batch")
+@round_trip_budget(1)
+def get_recipes_ingredients(
+    batch: recipe_schema.RecipeIds,
+    recipes_service: RecipeService = recipe_depends,
+):
+    """Récupère les ingredients de plusieurs repats en un seul appel"""
+    try:
+        grouped = recipes_service.get_ingredients_of_recipes(batch.recipe_ids)
+        return [
+            {"recipe_id": recipe_id, "ingredients": ingredients}
+            for recipe_id, ingredients in grouped.items()
+        ]
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors de la récupèration des ingredients - {e}",
+        )
+
+
+@router.post("/production", status_code=http_status.HTTP_201_CREATED)
+def record_production(
+    production: recipe_schema.Production,
+    recipes_service: RecipeService = recipe_depends,
+):
+    """Déduit du stock les ingredients d'un lot de productions"""
+    try:
+        production_dict = json.loads(production.model_dump_json())
+        return recipes_service.record_production(
+            production_dict["items"], production_dict["adjusted_by"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors de la production - {e}",
+        )
+
+
+@router.post("/simulate-costs")
+def simulate_costs(
+    simulation: recipe_schema.CostSimulation,
+    recipes_service: RecipeService = recipe_depends,
+):
+    """Simule l'impact de nouveaux coûts unitaires sur le coût des repats"""
+    try:
+        simulation_dict = json.loads(simulation.model_dump_json())
+        return recipes_service.simulate_costs(
+            simulation_dict["scenarios"], simulation_dict["only_affected"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Une erreur serveur est survenue lors de la simulation - {e}",
+        )
+
+
 @router.get(
     "/ingredients/{recipe_id}",
 )
+@round_trip_budget(1)
 def get_recipe_ingredients(
     recipe_id: int,
+    response: Response,
     recipes_service: RecipeService = recipe_depends,  # type: ignore
 ):
     """Récupère les ingredients d'un repat"""
     try:
-        recipe = recipes_service.get_ingredients_of_recipe(recipe_id)
+        cached = read_cache.get(
+            "recipe_ingredients",
+            recipe_id,
+            lambda: recipes_service.get_ingredients_of_recipe(recipe_id),
+        )
+        mark_staleness(response, cached)
+        recipe = cached.value
         if not recipe:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
@@ -90,18 +218,29 @@ def create_recipe(
 
 
 @router.get("/{recipe_id}", response_model=recipe_schema.Recipe)
+@round_trip_budget(2)
 def get_recipe(
     recipe_id: int,
+    request: Request,
+    response: Response,
     recipes_service: RecipeService = recipe_depends,  # type: ignore
 ):
     """Récupère les détails d'un repat par son ID"""
     try:
+        if request.headers.get("if-none-match"):
+            version = recipes_service.get_recipe_by_id(recipe_id, VERSION_COLUMNS)
+            if version:
+                etag = row_etag("recipe", version, "id")
+                if is_not_modified(request, etag):
+                    return not_modified(etag)
+
         recipe = recipes_service.get_recipe_by_id(recipe_id)
         if not recipe:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
                 detail="repat non trouvée",
             )
+        response.headers["ETag"] = row_etag("recipe", recipe, "id")
         return recipe
     except HTTPException as e:
         raise e
@@ -116,16 +255,35 @@ def get_recipe(
 def update_recipe(
     recipe_id: int,
     update_data: dict[str, Any],
+    request: Request,
+    response: Response,
     recipes_service: RecipeService = recipe_depends,
 ):
     """Met à jour un repat existante."""
     try:
-        recipe = recipes_service.update_recipe(recipe_id, update_data)
+        # If-Match : l'écriture n'a lieu que si last_updated n'a pas bougé
+        version = None
+        if request.headers.get("if-match"):
+            version = recipes_service.get_recipe_by_id(recipe_id, VERSION_COLUMNS)
+            if not version:
+                raise HTTPException(
+                    status_code=http_status.HTTP_404_NOT_FOUND,
+                    detail="repat non trouvée",
+                )
+            check_if_match(request, row_etag("recipe", version, "id"))
+
+        recipe = recipes_service.update_recipe(recipe_id, update_data, version=version)
+        if not recipe and version is not None:
+            raise HTTPException(
+                status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+                detail="La ressource a été modifiée entre-temps",
+            )
         if not recipe:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
                 detail="repat non trouvée",
             )
+        response.headers["ETag"] = row_etag("recipe", recipe, "id")
         return recipe
     except HTTPException as e:
         raise e
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,3 +10,96 @@ class Config:
         self.SUPABASE_URL = os.getenv("SUPABASE_URL", "")
         self.SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
         self.SUPABASE_STORAGE_BUCKET = os.getenv("SUPABASE_STORAGE_BUCKET", "")
+        # Alertes d'expiration et de stock bas
+        self.ALERTS_ENABLED = os.getenv("ALERTS_ENABLED", "true").lower() == "true"
+        self.ALERT_SINK = os.getenv("ALERT_SINK", "log")
+        self.ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+        self.ALERT_REFRESH_SECONDS = float(os.getenv("ALERT_REFRESH_SECONDS", "300"))
+        self.ALERT_EXPIRY_WARNING_HOURS = float(
+            os.getenv("ALERT_EXPIRY_WARNING_HOURS", "48")
+        )
+        # Tableau de bord
+        self.DASHBOARD_REBUILD_SECONDS = float(
+            os.getenv("DASHBOARD_REBUILD_SECONDS", "600")
+        )
+        self.DASHBOARD_WASTE_WINDOW_DAYS = int(
+            os.getenv("DASHBOARD_WASTE_WINDOW_DAYS", "7")
+        )
+        # Compression des réponses au-delà de ce seuil (octets)
+        self.COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        # Flux de changements : "local" (écritures de ce process) ou "database"
+        self.CHANGE_FEED_SOURCE = os.getenv("CHANGE_FEED_SOURCE", "local")
+        # Contrôle d'admission : concurrence globale et par route, file bornée
+        self.ADMISSION_GLOBAL_LIMIT = int(os.getenv("ADMISSION_GLOBAL_LIMIT", "32"))
+        self.ADMISSION_ROUTE_LIMIT = int(os.getenv("ADMISSION_ROUTE_LIMIT", "16"))
+        self.ADMISSION_CRITICAL_RESERVED = int(
+            os.getenv("ADMISSION_CRITICAL_RESERVED", "4")
+        )
+        self.ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+        self.ADMISSION_QUEUE_TIMEOUT = float(
+            os.getenv("ADMISSION_QUEUE_TIMEOUT", "2")
+        )
+        self.ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+        # Résilience des appels Supabase : timeouts, réessais, disjoncteurs
+        self.SUPABASE_TIMEOUT_SECONDS = float(
+            os.getenv("SUPABASE_TIMEOUT_SECONDS", "10")
+        )
+        self.STORAGE_TIMEOUT_SECONDS = float(os.getenv("STORAGE_TIMEOUT_SECONDS", "30"))
+        self.SUPABASE_RETRIES = int(os.getenv("SUPABASE_RETRIES", "2"))
+        self.CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+        # Cache de lecture stale-while-revalidate, par endpoint (ingredients,
+        # ingredient, recipes, recipe_ingredients, order_analytics) ; invalidé
+        # par le flux de changements, local au process sauf en "database". Seules
+        # les analyses, qui tolèrent un léger retard, sont en cache par défaut
+        self.READ_CACHE_ENDPOINTS = os.getenv("READ_CACHE_ENDPOINTS", "order_analytics")
+        self.READ_CACHE_SOFT_TTL_SECONDS = float(
+            os.getenv("READ_CACHE_SOFT_TTL_SECONDS", "30")
+        )
+        self.READ_CACHE_HARD_TTL_SECONDS = float(
+            os.getenv("READ_CACHE_HARD_TTL_SECONDS", "3600")
+        )
+        # Profilage à la demande (en-tête X-Profile) ou par échantillonnage
+        self.PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+        self.PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.PROFILE_SAMPLE_ROUTES = os.getenv("PROFILE_SAMPLE_ROUTES", "")
+        self.PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+        self.PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+        # Traçage des allers-retours Supabase ; "enforce" fait échouer les
+        # routes qui dépassent leur budget (tests), "warn" le journalise
+        self.ROUND_TRIP_REPEAT_THRESHOLD = int(
+            os.getenv("ROUND_TRIP_REPEAT_THRESHOLD", "3")
+        )
+        self.ROUND_TRIP_BUDGET_MODE = os.getenv("ROUND_TRIP_BUDGET_MODE", "warn")
+        # Clés Idempotency-Key conservées (nombre, durée) pour rejouer les
+        # écritures ; le stockage est en mémoire, il impose un seul worker.
+        # Désactivé par défaut avec plusieurs workers : les écritures ne sont
+        # alors plus dédupliquées, et main.py refuse IDEMPOTENCY_ENABLED=true
+        multiple_workers = int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+        self.IDEMPOTENCY_ENABLED = (
+            os.getenv(
+                "IDEMPOTENCY_ENABLED", "false" if multiple_workers else "true"
+            ).lower()
+            == "true"
+        )
+        self.IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+        self.IDEMPOTENCY_TTL_SECONDS = float(
+            os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")
+        )
+        # Serveur de production
+        self.HOST = os.getenv("HOST", "0.0.0.0")
+        self.PORT = int(os.getenv("PORT", "8000"))
+        # Un seul worker par défaut : alertes, lots FEFO, caches et clés
+        # d'idempotence sont gardés en mémoire, propres à chaque process
+        self.WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+        self.SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+        self.SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+        self.GRACEFUL_SHUTDOWN_SECONDS = int(
+            os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30")
+        )
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Configuration du process, lue une seule fois"""
+    return Config()
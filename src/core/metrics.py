@@ -0,0 +1,12 @@
+from typing import Any, Callable
+
+# Sources de métriques exposées par GET /api/v1/metrics
+_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def register(name: str, source: Callable[[], dict[str, Any]]) -> None:
+    _sources[name] = source
+
+
+def collect() -> dict[str, Any]:
+    return {name: source() for name, source in _sources.items()}
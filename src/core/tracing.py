@@ -0,0 +1,52 @@
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+
+@dataclass
+class RoundTrip:
+    upstream: str
+    label: str
+    seconds: float
+
+    @property
+    def kind(self) -> str:
+        if self.upstream == "postgrest" and " rpc/" in self.label:
+            return "rpc"
+        return self.upstream
+
+
+@dataclass
+class RequestTrace:
+    """Allers-retours vers Supabase faits pendant une requête"""
+
+    calls: list[RoundTrip] = field(default_factory=list)
+
+    def by_kind(self) -> dict[str, tuple[int, float]]:
+        totals: dict[str, tuple[int, float]] = {}
+        for call in self.calls:
+            count, seconds = totals.get(call.kind, (0, 0.0))
+            totals[call.kind] = (count + 1, seconds + call.seconds)
+        return totals
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Requêtes semblables (même méthode, même table) émises plusieurs fois"""
+        counts = Counter(call.label for call in self.calls)
+        return {label: n for label, n in counts.items() if n >= threshold}
+
+
+# Les routes sync tournent dans le threadpool avec une copie du contexte :
+# la trace, un objet mutable, y reste partagée avec la requête
+_current: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    trace = RequestTrace()
+    _current.set(trace)
+    return trace
+
+
+def record(upstream: str, label: str, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.calls.append(RoundTrip(upstream, label, seconds))
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
 
@@ -17,6 +17,12 @@ class WasteCategory(Enum):
     expired = "expired"
 
 
+class HistoryInterval(Enum):
+    hour = "hour"
+    day = "day"
+    week = "week"
+
+
 class Ingredient(BaseModel):
     sku: str
     name: str
@@ -47,3 +53,14 @@ class Stock_Adjustment(BaseModel):
     adjusted_by: str | None
     order_id: int | None
     recipe_id: int | None
+
+
+class Stock_Count_Line(BaseModel):
+    sku: str
+    counted: float = Field(ge=0, allow_inf_nan=False)
+
+
+class Stock_Count(BaseModel):
+    lines: list[Stock_Count_Line]
+    counted_by: str | None = None
+    notes: str | None = None
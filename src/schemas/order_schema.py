@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from datetime import datetime
 from enum import Enum
 from src.schemas.ingredients_schema import Ingredient
 
@@ -28,3 +29,27 @@ class ORDER(BaseModel):
     completed_at: str | None = None
     last_updated: str | None = None
     delete: bool | None = False
+
+
+# Réception groupée de commandes
+class ReceiveLine(BaseModel):
+    order_id: int
+    # 0 : commande close sans rien recevoir
+    quantity_received: float = Field(ge=0, allow_inf_nan=False)
+    unit_price_received: float | None = Field(None, ge=0, allow_inf_nan=False)
+    expire_at: datetime | None = None
+    notes: str | None = None
+
+
+class ReceiveOrders(BaseModel):
+    lines: list[ReceiveLine]
+    received_by: str | None = None
+
+
+# Granularité de /orders/analytics
+class AnalyticsPeriod(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    QUARTER = "quarter"
+    YEAR = "year"
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+# Valeurs comparées aux champs des évènements, donc hashables
+FilterValue = str | int | float | bool
+
+
+class Subscription(BaseModel):
+    topics: list[str] = []
+    filters: dict[str, dict[str, FilterValue | list[FilterValue]]] = {}
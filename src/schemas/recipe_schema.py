@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
@@ -10,3 +10,27 @@ class Recipe(BaseModel):
     active: bool | None = True
     delete: bool | None = False
     last_updated: datetime | None = None
+
+
+class RecipeIds(BaseModel):
+    recipe_ids: list[int]
+
+
+class ProductionItem(BaseModel):
+    recipe_id: int
+    servings: float = Field(gt=0, allow_inf_nan=False)
+
+
+class Production(BaseModel):
+    items: list[ProductionItem]
+    adjusted_by: str | None = None
+
+
+class CostScenario(BaseModel):
+    name: str | None = None
+    unit_costs: dict[str, float]
+
+
+class CostSimulation(BaseModel):
+    scenarios: list[CostScenario]
+    only_affected: bool = True
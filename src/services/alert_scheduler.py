@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import logging
+import queue
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from threading import Lock
+from typing import Any
+
+import requests
+
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+INGREDIENT_ALERT_COLUMNS = (
+    "sku, name, current_stock_level, min_stock_level, expire_at, delete"
+)
+
+
+# -------------------SINKS-------------------------
+class AlertSink(ABC):
+    """Destination des alertes"""
+
+    @abstractmethod
+    def send(self, alert: dict[str, Any]) -> None: ...
+
+
+class LogAlertSink(AlertSink):
+    def send(self, alert: dict[str, Any]) -> None:
+        logger.warning("[alert] %s", alert)
+
+
+class WebhookAlertSink(AlertSink):
+    def __init__(self, url: str, timeout: float = 5) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert: dict[str, Any]) -> None:
+        requests.post(self.url, json=alert, timeout=self.timeout).raise_for_status()
+
+
+class QueueAlertSink(AlertSink):
+    def __init__(self, alert_queue: queue.Queue | None = None) -> None:
+        self.queue = alert_queue if alert_queue is not None else queue.Queue()
+
+    def send(self, alert: dict[str, Any]) -> None:
+        self.queue.put(alert)
+
+
+def sink_from_config(config: Config) -> AlertSink:
+    if config.ALERT_SINK == "webhook" and config.ALERT_WEBHOOK_URL:
+        return WebhookAlertSink(config.ALERT_WEBHOOK_URL)
+    if config.ALERT_SINK == "queue":
+        return QueueAlertSink()
+    return LogAlertSink()
+
+
+# -------------------SCHEDULER-------------------------
+class AlertScheduler:
+    """Surveille les dates d'expiration et les niveaux de stock.
+
+    Les échéances ``expire_at`` sont gardées dans un tas-min : la boucle dort
+    jusqu'à la prochaine échéance ou la prochaine resynchronisation complète.
+    Une alerte n'est émise que lorsque l'état d'un ingrédient change.
+    """
+
+    def __init__(self) -> None:
+        self.sink: AlertSink = LogAlertSink()
+        self.refresh_seconds = 300.0
+        self.warning_seconds = 48 * 3600.0
+        # (échéance, sku, état à atteindre, expire_at de référence)
+        self._heap: list[tuple[float, str, str, float]] = []
+        self._expiries: dict[str, float] = {}
+        self._ingredients: dict[str, dict[str, Any]] = {}
+        self._states: dict[str, dict[str, str]] = {}
+        self._pending: list[dict[str, Any]] = []
+        # Faux tant que la première resynchronisation n'a pas eu lieu
+        self._seeded = False
+        self._lock = Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, config: Config, sink: AlertSink | None = None) -> None:
+        self.sink = sink or sink_from_config(config)
+        self.refresh_seconds = config.ALERT_REFRESH_SECONDS
+        self.warning_seconds = config.ALERT_EXPIRY_WARNING_HOURS * 3600
+        self._seeded = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def observe(self, ingredient: dict[str, Any]) -> None:
+        """Met à jour l'état d'un ingrédient après une écriture"""
+        if not self.running or not self._seeded or not isinstance(ingredient, dict):
+            return
+        if "sku" not in ingredient:
+            return
+        with self._lock:
+            self._observe(ingredient, time.time())
+        self._wake()
+
+    def observe_stock_delta(
+        self, sku: str, delta: float, expire_at: str | None = None
+    ) -> None:
+        """Applique une variation de stock connue sans la ligne complète
+        (écritures groupées faites par une RPC)"""
+        if not self.running or not self._seeded:
+            return
+        with self._lock:
+            known = self._ingredients.get(sku)
+            if known is None or known.get("current_stock_level") is None:
+                return
+            changed = {
+                "sku": sku,
+                "current_stock_level": known["current_stock_level"] + delta,
+            }
+            if expire_at:
+                changed["expire_at"] = expire_at
+            self._observe(changed, time.time())
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _observe(self, ingredient: dict[str, Any], now: float) -> None:
+        sku = ingredient["sku"]
+        if ingredient.get("delete"):
+            self._forget(sku)
+            return
+        # Les écritures partielles complètent le dernier état connu
+        ingredient = {**self._ingredients.get(sku, {}), **ingredient}
+        self._ingredients[sku] = ingredient
+
+        current = ingredient.get("current_stock_level")
+        minimum = ingredient.get("min_stock_level")
+        if current is not None and minimum is not None:
+            stock_state = "low" if current <= minimum else "ok"
+            self._transition(ingredient, "stock", stock_state)
+
+        if "expire_at" not in ingredient:
+            return
+        expire_at = ingredient["expire_at"]
+        if not expire_at:
+            self._expiries.pop(sku, None)
+            self._transition(ingredient, "expiry", "ok")
+            return
+        expire_ts = datetime.fromisoformat(expire_at).timestamp()
+        self._expiries[sku] = expire_ts
+        warning_ts = expire_ts - self.warning_seconds
+        if now >= expire_ts:
+            self._transition(ingredient, "expiry", "expired")
+        elif now >= warning_ts:
+            self._transition(ingredient, "expiry", "expiring")
+            heapq.heappush(self._heap, (expire_ts, sku, "expired", expire_ts))
+        else:
+            self._transition(ingredient, "expiry", "ok")
+            heapq.heappush(self._heap, (warning_ts, sku, "expiring", expire_ts))
+            heapq.heappush(self._heap, (expire_ts, sku, "expired", expire_ts))
+
+    def _forget(self, sku: str) -> None:
+        self._states.pop(sku, None)
+        self._expiries.pop(sku, None)
+        self._ingredients.pop(sku, None)
+
+    def _transition(self, ingredient: dict[str, Any], kind: str, state: str) -> None:
+        states = self._states.setdefault(ingredient["sku"], {})
+        previous = states.get(kind, "ok")
+        states[kind] = state
+        # Au démarrage l'état est seulement amorcé : un redémarrage ne renvoie
+        # pas les alertes déjà émises pour les ingrédients bas ou expirés
+        if previous == state or not self._seeded:
+            return
+        self._pending.append(
+            {
+                "sku": ingredient["sku"],
+                "name": ingredient.get("name"),
+                "kind": kind,
+                "state": state,
+                "previous_state": previous,
+                "current_stock_level": ingredient.get("current_stock_level"),
+                "min_stock_level": ingredient.get("min_stock_level"),
+                "expire_at": ingredient.get("expire_at"),
+                "at": datetime.now().isoformat(),
+            }
+        )
+
+    def _fire_due(self, now: float) -> None:
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, sku, state, expire_ts = heapq.heappop(self._heap)
+                # Entrée périmée si expire_at a changé depuis
+                if self._expiries.get(sku) != expire_ts:
+                    continue
+                states = self._states.setdefault(sku, {})
+                if state == "expiring" and states.get("expiry") == "expired":
+                    continue
+                self._transition(self._ingredients[sku], "expiry", state)
+
+    def _refresh(self, rows: list[dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock:
+            seen = {row["sku"] for row in rows}
+            for sku in list(self._states):
+                if sku not in seen:
+                    self._forget(sku)
+            # Reconstruction complète du tas pour purger les entrées périmées
+            self._heap = []
+            for row in rows:
+                self._observe(row, now)
+            self._seeded = True
+
+    def _fetch(self) -> list[dict[str, Any]]:
+        from src.services.supabase_services.ingredient_service import (
+            IngredientService,
+        )
+
+        service = IngredientService()
+        return service.fetch_all(
+            lambda: service.client.table("ingredients")
+            .select(INGREDIENT_ALERT_COLUMNS)
+            .eq("delete", False)
+            .order("sku")
+        )
+
+    async def _flush(self) -> None:
+        with self._lock:
+            alerts, self._pending = self._pending, []
+        for alert in alerts:
+            try:
+                await asyncio.to_thread(self.sink.send, alert)
+            except Exception:
+                logger.exception("Failed to deliver alert for %s", alert["sku"])
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        next_refresh = 0.0
+        while True:
+            if time.time() >= next_refresh:
+                try:
+                    self._refresh(await asyncio.to_thread(self._fetch))
+                except Exception:
+                    logger.exception("Alert scheduler refresh failed")
+                next_refresh = time.time() + self.refresh_seconds
+            self._fire_due(time.time())
+            await self._flush()
+
+            with self._lock:
+                next_due = self._heap[0][0] if self._heap else next_refresh
+            timeout = max(min(next_due, next_refresh) - time.time(), 0)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+alert_scheduler = AlertScheduler()
@@ -0,0 +1,80 @@
+import time
+from bisect import bisect_right, insort
+from datetime import datetime
+from threading import Lock
+from typing import Any
+
+# Les lots sans date d'expiration passent après tous les autres
+NO_EXPIRY = float("inf")
+
+
+def _expiry_key(lot: dict[str, Any]) -> tuple[float, int]:
+    expire_at = lot.get("expire_at")
+    if not expire_at:
+        return (NO_EXPIRY, lot["id"])
+    return (datetime.fromisoformat(expire_at).timestamp(), lot["id"])
+
+
+class _SkuLots:
+    def __init__(self, lots: list[dict[str, Any]]) -> None:
+        self.loaded_at = time.monotonic()
+        self.lots = {lot["id"]: lot for lot in lots}
+        self.keys = sorted(_expiry_key(lot) for lot in lots)
+
+    def add(self, lot: dict[str, Any]) -> None:
+        self.lots[lot["id"]] = lot
+        insort(self.keys, _expiry_key(lot))
+
+
+class BatchIndex:
+    """Index FEFO des lots ouverts par SKU, trié par date d'expiration.
+
+    L'index est propre au process et ne sert qu'aux lectures : chaque SKU est
+    rechargé depuis la base après ``ttl`` secondes pour rattraper les écritures
+    des autres workers. Les sorties de stock décrémentent les lots en base
+    (RPC ``consume_batches``) et invalident le SKU.
+    """
+
+    def __init__(self, ttl: float = 60) -> None:
+        self.ttl = ttl
+        self._skus: dict[str, _SkuLots] = {}
+        self._lock = Lock()
+
+    def is_loaded(self, sku: str) -> bool:
+        entry = self._skus.get(sku)
+        return entry is not None and time.monotonic() - entry.loaded_at < self.ttl
+
+    def load(self, sku: str, lots: list[dict[str, Any]]) -> None:
+        open_lots = [lot for lot in lots if (lot["quantity_remaining"] or 0) > 0]
+        with self._lock:
+            self._skus[sku] = _SkuLots(open_lots)
+
+    def add(self, lot: dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._skus.get(lot["ingredient_sku"])
+            if entry is not None:
+                entry.add(lot)
+
+    def invalidate(self, sku: str) -> None:
+        with self._lock:
+            self._skus.pop(sku, None)
+
+    def lots(self, sku: str) -> list[dict[str, Any]]:
+        """Lots ouverts du SKU, du premier au dernier à expirer"""
+        with self._lock:
+            entry = self._skus.get(sku)
+            if entry is None:
+                return []
+            return [dict(entry.lots[key[1]]) for key in entry.keys]
+
+    def expiring(self, sku: str, before: datetime) -> list[dict[str, Any]]:
+        """Lots ouverts expirant avant ``before`` (bisect, O(log n + k))"""
+        with self._lock:
+            entry = self._skus.get(sku)
+            if entry is None:
+                return []
+            end = bisect_right(entry.keys, (before.timestamp(), float("inf")))
+            return [dict(entry.lots[key[1]]) for key in entry.keys[:end]]
+
+
+batch_index = BatchIndex()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable
+
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+TOPICS = {"ingredients": "sku", "orders": "id", "recipes": "id"}
+
+
+class Subscriber:
+    """Une connexion abonnée : topics suivis et filtres champ -> valeurs"""
+
+    def __init__(self, max_pending: int = 100) -> None:
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=max_pending)
+        self.topics: set[str] = set()
+        self.filters: dict[str, dict[str, set[Any]]] = {}
+        self.overflowed = False
+
+    def subscribe(self, topics: list[str], filters: dict[str, dict[str, Any]]) -> None:
+        self.topics = {x for x in topics if x in TOPICS}
+        self.filters = {
+            topic: {
+                field: set(values if isinstance(values, list) else [values])
+                for field, values in fields.items()
+            }
+            for topic, fields in filters.items()
+            if topic in TOPICS
+        }
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        if event["topic"] not in self.topics:
+            return False
+        for field, values in self.filters.get(event["topic"], {}).items():
+            value = event["key"] if field == TOPICS[event["topic"]] else None
+            if value is None:
+                value = (event["changed"] or {}).get(field)
+            if value not in values:
+                return False
+        return True
+
+
+class ChangeFeed:
+    """Diffusion des changements (created/updated/deleted) aux abonnés WebSocket.
+
+    Chaque évènement est sérialisé une seule fois puis déposé dans la file de
+    chaque abonné concerné. Les évènements viennent des chemins d'écriture
+    locaux (source ``local``) ou du flux Realtime de Supabase (``database``).
+    """
+
+    def __init__(self) -> None:
+        self.source = "local"
+        self._subscribers: set[Subscriber] = set()
+        # Appelés pour chaque évènement, local ou venant de la base
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._realtime_client: Any = None
+
+    async def start(self, config: Config) -> None:
+        self.source = config.CHANGE_FEED_SOURCE
+        self._loop = asyncio.get_running_loop()
+        if self.source == "database":
+            try:
+                await self._listen_database(config)
+            except Exception:
+                logger.exception("Realtime subscription failed, using local events")
+                self.source = "local"
+
+    async def stop(self) -> None:
+        if self._realtime_client is not None:
+            await self._realtime_client.remove_all_channels()
+            self._realtime_client = None
+        for subscriber in list(self._subscribers):
+            self._close(subscriber)
+
+    # -------------------SUBSCRIBERS-------------------------
+    def connect(self) -> Subscriber:
+        subscriber = Subscriber()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def _close(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        try:
+            subscriber.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def add_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _notify_listeners(self, event: dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Change feed listener failed")
+
+    # -------------------PUBLISHING-------------------------
+    def publish(
+        self,
+        topic: str,
+        action: str,
+        key: Any,
+        changed: dict[str, Any] | None = None,
+    ) -> None:
+        """Publie un changement fait par ce process (appelable depuis un thread)"""
+        event = self._event(topic, action, key, changed)
+        self._notify_listeners(event)
+        if self.source != "local" or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _event(
+        self, topic: str, action: str, key: Any, changed: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        return {
+            "topic": topic,
+            "action": action,
+            "key": key,
+            "changed": changed,
+            "at": datetime.now().isoformat(),
+        }
+
+    def _dispatch(self, event: dict[str, Any]) -> None:
+        targets = []
+        for subscriber in list(self._subscribers):
+            try:
+                if subscriber.matches(event):
+                    targets.append(subscriber)
+            except Exception:
+                # Un filtre invalide ne doit pas priver les autres abonnés
+                logger.exception("Dropping subscriber with an unusable filter")
+                self._close(subscriber)
+        if not targets:
+            return
+        message = json.dumps(event, default=str)
+        for subscriber in targets:
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Un client trop lent est déconnecté plutôt que de bloquer les autres
+                subscriber.overflowed = True
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                self._close(subscriber)
+
+    # -------------------DATABASE SOURCE-------------------------
+    async def _listen_database(self, config: Config) -> None:
+        from supabase import acreate_client
+
+        client = await acreate_client(config.SUPABASE_URL, config.SUPABASE_KEY)
+        channel = client.channel("change-feed")
+        for table in TOPICS:
+            channel.on_postgres_changes(
+                "*", schema="public", table=table, callback=self._on_database_change
+            )
+        await channel.subscribe()
+        self._realtime_client = client
+
+    def _on_database_change(self, payload: dict[str, Any]) -> None:
+        data = payload.get("data", payload)
+        topic = data.get("table")
+        if topic not in TOPICS:
+            return
+        kind = str(data.get("type", "")).lower()
+        record = data.get("record") or {}
+        old = data.get("old_record") or {}
+        if kind == "insert":
+            action, changed = "created", record
+        elif kind == "delete" or record.get("delete"):
+            action, changed = "deleted", {"delete": True}
+        else:
+            action = "updated"
+            changed = {k: v for k, v in record.items() if old.get(k) != v}
+        key = record.get(TOPICS[topic], old.get(TOPICS[topic]))
+        event = self._event(topic, action, key, changed)
+        self._notify_listeners(event)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+
+
+change_feed = ChangeFeed()
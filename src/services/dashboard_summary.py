@@ -0,0 +1,245 @@
+import asyncio
+import logging
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable
+
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+OPEN_ORDER_STATUSES = {"pending", "confirmed"}
+
+
+class DashboardSummary:
+    """Agrégats du tableau de bord tenus en mémoire.
+
+    Les chemins d'écriture des services appliquent leurs deltas au fil de
+    l'eau ; une reconstruction complète périodique sert de contrôle de
+    cohérence et rattrape les écritures faites par d'autres process. Les
+    deltas reçus pendant une reconstruction sont rejoués sur son résultat.
+    """
+
+    def __init__(self) -> None:
+        self.rebuild_seconds = 600.0
+        self.waste_window = timedelta(days=7)
+        self.rebuilt_at: datetime | None = None
+        self.updated_at: datetime | None = None
+        # sku -> (value, status) et id -> (status, value_ordered)
+        self._ingredients: dict[str, tuple[float, str | None]] = {}
+        self._orders: dict[int, tuple[str, float]] = {}
+        self._waste: deque[tuple[datetime, float]] = deque()
+        self._inventory_value = 0.0
+        self._ingredient_statuses: Counter = Counter()
+        self._order_statuses: Counter = Counter()
+        self._pending_spend = 0.0
+        # Un tampon par reconstruction en cours : deltas à rejouer sur son
+        # résultat, qui peut avoir été lu avant eux
+        self._replays: list[list[tuple[Callable[..., None], tuple]]] = []
+        self._lock = Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._rebuild_requested: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    # -------------------LIFECYCLE-------------------------
+    def start(self, config: Config) -> None:
+        self.rebuild_seconds = config.DASHBOARD_REBUILD_SECONDS
+        self.waste_window = timedelta(days=config.DASHBOARD_WASTE_WINDOW_DAYS)
+        self._loop = asyncio.get_running_loop()
+        self._rebuild_requested = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def request_rebuild(self) -> None:
+        """Demande une reconstruction anticipée (écriture sans delta connu)"""
+        if self._loop is not None and self._rebuild_requested is not None:
+            self._loop.call_soon_threadsafe(self._rebuild_requested.set)
+
+    async def _run(self) -> None:
+        assert self._rebuild_requested is not None
+        while True:
+            try:
+                await asyncio.to_thread(self.rebuild)
+            except Exception:
+                logger.exception("Dashboard summary rebuild failed")
+            self._rebuild_requested.clear()
+            try:
+                await asyncio.wait_for(
+                    self._rebuild_requested.wait(), self.rebuild_seconds
+                )
+                # Regroupe les demandes rapprochées en une seule reconstruction
+                await asyncio.sleep(2)
+            except asyncio.TimeoutError:
+                pass
+
+    # -------------------INCREMENTAL UPDATES-------------------------
+    def _observe(self, apply: Callable[..., None], *args: Any) -> None:
+        with self._lock:
+            apply(*args)
+            for replay in self._replays:
+                replay.append((apply, args))
+            self.updated_at = datetime.now()
+
+    def observe_ingredient(self, ingredient: dict[str, Any]) -> None:
+        if not isinstance(ingredient, dict) or "sku" not in ingredient:
+            return
+        self._observe(self._apply_ingredient, ingredient)
+
+    def observe_value_delta(self, sku: str, delta: float) -> None:
+        """Applique une variation de valeur de stock connue sans la ligne complète"""
+        self._observe(self._apply_value_delta, sku, delta)
+
+    def observe_order(self, order: dict[str, Any]) -> None:
+        if not isinstance(order, dict) or "id" not in order:
+            return
+        self._observe(self._apply_order, order)
+
+    def observe_waste(self, cost_impact: float, at: datetime | None = None) -> None:
+        self._observe(self._apply_waste, at or datetime.now(), cost_impact or 0)
+
+    def _apply_ingredient(self, ingredient: dict[str, Any]) -> None:
+        previous = self._ingredients.pop(ingredient["sku"], None)
+        if previous is not None:
+            self._inventory_value -= previous[0]
+            self._ingredient_statuses[previous[1]] -= 1
+        if not ingredient.get("delete"):
+            value = ingredient.get("value", previous[0] if previous else 0) or 0
+            status = ingredient.get("status", previous[1] if previous else None)
+            self._ingredients[ingredient["sku"]] = (value, status)
+            self._inventory_value += value
+            self._ingredient_statuses[status] += 1
+
+    def _apply_value_delta(self, sku: str, delta: float) -> None:
+        previous = self._ingredients.get(sku)
+        if previous is None:
+            return
+        self._ingredients[sku] = (previous[0] + delta, previous[1])
+        self._inventory_value += delta
+
+    def _apply_order(self, order: dict[str, Any]) -> None:
+        previous = self._orders.pop(order["id"], None)
+        if previous is not None:
+            self._order_statuses[previous[0]] -= 1
+            self._pending_spend -= previous[1]
+        status = order.get("status", previous[0] if previous else None)
+        if not order.get("delete") and status in OPEN_ORDER_STATUSES:
+            value = order.get("value_ordered", previous[1] if previous else 0) or 0
+            self._orders[order["id"]] = (status, value)
+            self._order_statuses[status] += 1
+            self._pending_spend += value
+
+    def _apply_waste(self, at: datetime, cost_impact: float) -> None:
+        self._waste.append((at, cost_impact))
+
+    # -------------------FULL REBUILD-------------------------
+    def rebuild(self) -> None:
+        """Recalcule tous les agrégats depuis la base"""
+        replay: list[tuple[Callable[..., None], tuple]] = []
+        with self._lock:
+            self._replays.append(replay)
+        try:
+            self._rebuild(replay)
+        finally:
+            with self._lock:
+                self._replays.remove(replay)
+
+    def _rebuild(self, replay: list[tuple[Callable[..., None], tuple]]) -> None:
+        from src.services.supabase_services.supabase_service import SupabaseService
+
+        service = SupabaseService()
+        client = service.client
+        since = datetime.now() - self.waste_window
+        ingredients = service.fetch_all(
+            lambda: client.table("ingredients")
+            .select("sku, value, status")
+            .eq("delete", False)
+            .order("sku")
+        )
+        orders = service.fetch_all(
+            lambda: client.table("orders")
+            .select("id, status, value_ordered")
+            .eq("delete", False)
+            .in_("status", sorted(OPEN_ORDER_STATUSES))
+            .order("id")
+        )
+        waste = service.fetch_all(
+            lambda: client.table("stock_adjustments")
+            .select("created_at, cost_impact")
+            .eq("adjustment_type", "waste")
+            .gte("created_at", since.isoformat())
+            .order("created_at")
+        )
+
+        ingredient_map = {
+            x["sku"]: (x["value"] or 0, x["status"]) for x in ingredients
+        }
+        order_map = {x["id"]: (x["status"], x["value_ordered"] or 0) for x in orders}
+        inventory_value = sum(x[0] for x in ingredient_map.values())
+        with self._lock:
+            if self.rebuilt_at is not None and abs(
+                inventory_value - self._inventory_value
+            ) > 0.01:
+                logger.info(
+                    "Dashboard inventory value drifted by %.2f",
+                    inventory_value - self._inventory_value,
+                )
+            self._ingredients = ingredient_map
+            self._orders = order_map
+            self._waste = deque(
+                (
+                    datetime.fromisoformat(x["created_at"])
+                    .astimezone()
+                    .replace(tzinfo=None),
+                    x["cost_impact"] or 0,
+                )
+                for x in waste
+            )
+            self._inventory_value = inventory_value
+            self._ingredient_statuses = Counter(x[1] for x in ingredient_map.values())
+            self._order_statuses = Counter(x[0] for x in order_map.values())
+            self._pending_spend = sum(x[1] for x in order_map.values())
+            # Écritures arrivées pendant les lectures : la base ne les montrait
+            # peut-être pas encore
+            for apply, args in replay:
+                apply(*args)
+            self.rebuilt_at = self.updated_at = datetime.now()
+
+    # -------------------READ-------------------------
+    def snapshot(self) -> dict[str, Any]:
+        if self.rebuilt_at is None:
+            self.rebuild()
+        with self._lock:
+            # Les pertes sorties de la fenêtre sont retirées à la lecture
+            horizon = datetime.now() - self.waste_window
+            while self._waste and self._waste[0][0] < horizon:
+                self._waste.popleft()
+            # Un ingrédient sans statut est compté sous "unknown"
+            ingredients_by_status: Counter = Counter()
+            for k, v in self._ingredient_statuses.items():
+                if v > 0:
+                    ingredients_by_status["unknown" if k is None else k] += v
+            return {
+                "inventory_value": round(self._inventory_value, 2),
+                "ingredients_by_status": dict(ingredients_by_status),
+                "open_orders_by_status": {
+                    k: v for k, v in self._order_statuses.items() if v > 0
+                },
+                "pending_spend": round(self._pending_spend, 2),
+                "recent_waste_cost": round(sum(x[1] for x in self._waste), 2),
+                "waste_window_days": self.waste_window.days,
+                "rebuilt_at": self.rebuilt_at.isoformat() if self.rebuilt_at else None,
+                "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            }
+
+
+dashboard_summary = DashboardSummary()
@@ -0,0 +1,176 @@
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _smooth_step(
+    level: "np.ndarray",
+    season: "np.ndarray",
+    y: "np.ndarray",
+    weekday: int,
+    alpha: float,
+    gamma: float,
+) -> None:
+    """Une étape de lissage exponentiel avec saisonnalité hebdomadaire (en place)"""
+    level[:] = alpha * (y - season[:, weekday]) + (1 - alpha) * level
+    season[:, weekday] = gamma * (y - level) + (1 - gamma) * season[:, weekday]
+
+
+class DemandForecast:
+    """Modèles de demande journalière (recipe_usage) pour tous les SKU.
+
+    Chaque SKU a un niveau et sept coefficients saisonniers (un par jour de la
+    semaine). L'ajustement se fait jour par jour mais pour tous les SKU à la
+    fois ; les jours clos sont ensuite intégrés au fil des ajustements reçus.
+    numpy n'est importé qu'au premier ajustement ou à la première prévision.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        gamma: float = 0.2,
+        history_days: int = 90,
+        refit_seconds: float = 24 * 3600,
+    ) -> None:
+        self.alpha = alpha
+        self.gamma = gamma
+        self.history_days = history_days
+        self.refit_seconds = refit_seconds
+        self.fitted_at: float | None = None
+        self.last_day: date | None = None
+        self._index: dict[str, int] = {}
+        # Tableaux numpy créés par fit
+        self._level: "np.ndarray | None" = None
+        self._season: "np.ndarray | None" = None
+        # Consommation des jours pas encore intégrés au modèle
+        self._pending: dict[date, dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._lock = Lock()
+
+    def needs_refit(self) -> bool:
+        return (
+            self.fitted_at is None
+            or time.monotonic() - self.fitted_at > self.refit_seconds
+        )
+
+    def fit(self, usage: list[dict[str, Any]], today: date | None = None) -> None:
+        """Ajuste tous les modèles sur l'historique de recipe_usage"""
+        import numpy as np
+
+        today = today or date.today()
+        start = today - timedelta(days=self.history_days)
+        n_days = self.history_days
+        skus = sorted({x["ingredient_sku"] for x in usage})
+        index = {sku: i for i, sku in enumerate(skus)}
+
+        matrix = np.zeros((len(skus), n_days))
+        pending: dict[date, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        rows, days, quantities = [], [], []
+        for x in usage:
+            day = datetime.fromisoformat(x["created_at"]).date()
+            quantity = abs(x["quantity_change"] or 0)
+            if day >= today:
+                pending[day][x["ingredient_sku"]] += quantity
+            elif day >= start:
+                rows.append(index[x["ingredient_sku"]])
+                days.append((day - start).days)
+                quantities.append(quantity)
+        np.add.at(
+            matrix,
+            (np.array(rows, dtype=np.intp), np.array(days, dtype=np.intp)),
+            quantities,
+        )
+
+        # Initialisation sur la première semaine
+        level = matrix[:, :7].mean(axis=1) if n_days else np.zeros(len(skus))
+        season = np.zeros((len(skus), 7))
+        for t in range(n_days):
+            weekday = (start + timedelta(days=t)).weekday()
+            _smooth_step(level, season, matrix[:, t], weekday, self.alpha, self.gamma)
+
+        with self._lock:
+            self._index = index
+            self._level = level
+            self._season = season
+            self._pending = pending
+            self.last_day = today - timedelta(days=1)
+            self.fitted_at = time.monotonic()
+
+    def record(self, sku: str, quantity: float, when: datetime | None = None) -> None:
+        """Ajoute une consommation reçue après l'ajustement du modèle"""
+        day = (when or datetime.now()).date()
+        with self._lock:
+            if self.last_day is None or day <= self.last_day:
+                # Trop ancien pour le modèle courant, le prochain fit le reprendra
+                return
+            self._pending[day][sku] += abs(quantity)
+
+    def _advance(self, today: date) -> None:
+        """Intègre les jours clos depuis le dernier ajustement"""
+        if self.last_day is None:
+            return
+        import numpy as np
+
+        day = self.last_day + timedelta(days=1)
+        while day < today:
+            totals = self._pending.pop(day, {})
+            new_skus = [sku for sku in totals if sku not in self._index]
+            if new_skus:
+                for sku in new_skus:
+                    self._index[sku] = len(self._index)
+                self._level = np.concatenate([self._level, np.zeros(len(new_skus))])
+                self._season = np.vstack([self._season, np.zeros((len(new_skus), 7))])
+            y = np.zeros(len(self._index))
+            for sku, quantity in totals.items():
+                y[self._index[sku]] = quantity
+            _smooth_step(
+                self._level, self._season, y, day.weekday(), self.alpha, self.gamma
+            )
+            self.last_day = day
+            day += timedelta(days=1)
+
+    def forecast(self, sku: str, horizon_days: int, today: date | None = None):
+        """Demande prévue pour aujourd'hui et les jours suivants"""
+        import numpy as np
+
+        today = today or date.today()
+        with self._lock:
+            self._advance(today)
+            i = self._index.get(sku)
+            if i is None:
+                return [0.0] * horizon_days
+            level = self._level[i]
+            season = self._season[i].copy()
+        weekdays = [(today + timedelta(days=t)).weekday() for t in range(horizon_days)]
+        return np.maximum(level + season[weekdays], 0).tolist()
+
+    def projection(
+        self, sku: str, stock: float, horizon_days: int, today: date | None = None
+    ) -> dict[str, Any]:
+        """Prévision journalière et date de rupture projetée"""
+        import numpy as np
+
+        today = today or date.today()
+        demand = self.forecast(sku, horizon_days, today)
+        # Le premier jour où la consommation cumulée dépasse le stock
+        cumulative = np.cumsum(demand)
+        out = np.flatnonzero(cumulative >= stock) if stock > 0 else np.array([0])
+        stockout = today + timedelta(days=int(out[0])) if len(out) else None
+        return {
+            "sku": sku,
+            "current_stock_level": stock,
+            "daily_forecast": [
+                {"date": (today + timedelta(days=t)).isoformat(), "quantity": q}
+                for t, q in enumerate(demand)
+            ],
+            "projected_stockout": stockout.isoformat() if stockout else None,
+        }
+
+
+demand_forecast = DemandForecast()
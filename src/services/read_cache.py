@@ -0,0 +1,137 @@
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+from src.core import metrics
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Endpoints à invalider quand un topic du flux de changements bouge
+INVALIDATED_BY = {
+    "ingredients": ("ingredients", "ingredient", "recipe_ingredients"),
+    "recipes": ("recipes", "recipe_ingredients"),
+    "orders": ("order_analytics",),
+}
+
+
+@dataclass
+class CachedRead:
+    value: Any
+    age: float
+    stale: bool
+    refresh_failed: bool = False
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+    refresh_failed: bool = False
+
+
+class ReadCache:
+    """Cache de lecture stale-while-revalidate pour les endpoints du catalogue.
+
+    Avant ``soft_ttl`` l'entrée est servie telle quelle. Entre ``soft_ttl`` et
+    ``hard_ttl`` elle est servie immédiatement et rafraîchie en tâche de fond,
+    ce qui garde la cuisine en lecture pendant une panne de Supabase. Au-delà
+    de ``hard_ttl`` la lecture redevient synchrone. Seuls les endpoints listés
+    dans ``endpoints`` passent par le cache.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.soft_ttl = 30.0
+        self.hard_ttl = 3600.0
+        self.endpoints: set[str] = set()
+        self.max_entries = max_entries
+        self._entries: dict[str, OrderedDict[Hashable, _Entry]] = {}
+        # Incrémenté à chaque invalidation : un rafraîchissement lancé avant
+        # ne doit pas réécrire une valeur périmée
+        self._generations: dict[str, int] = {}
+        self._refreshing: set[tuple[str, Hashable]] = set()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr")
+        self._lock = Lock()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "refresh_errors": 0}
+        metrics.register("read_cache", lambda: dict(self.stats))
+
+    def configure(self, config: Config) -> None:
+        self.soft_ttl = config.READ_CACHE_SOFT_TTL_SECONDS
+        self.hard_ttl = config.READ_CACHE_HARD_TTL_SECONDS
+        self.endpoints = {
+            x.strip() for x in config.READ_CACHE_ENDPOINTS.split(",") if x.strip()
+        }
+
+    def enabled(self, endpoint: str) -> bool:
+        return endpoint in self.endpoints
+
+    def get(
+        self, endpoint: str, key: Hashable, load: Callable[[], Any]
+    ) -> CachedRead:
+        if not self.enabled(endpoint):
+            return CachedRead(load(), 0.0, False)
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.setdefault(endpoint, OrderedDict())
+            entry = entries.get(key)
+            if entry is not None and now - entry.stored_at < self.hard_ttl:
+                entries.move_to_end(key)
+                age = now - entry.stored_at
+                stale = age >= self.soft_ttl
+                self.stats["stale" if stale else "hits"] += 1
+                if stale and (endpoint, key) not in self._refreshing:
+                    self._refreshing.add((endpoint, key))
+                    self._executor.submit(self._refresh, endpoint, key, load)
+                return CachedRead(entry.value, age, stale, entry.refresh_failed)
+            self.stats["misses"] += 1
+            generation = self._generations.get(endpoint, 0)
+
+        value = load()
+        self._store(endpoint, key, value, generation)
+        return CachedRead(value, 0.0, False)
+
+    def _store(
+        self, endpoint: str, key: Hashable, value: Any, generation: int
+    ) -> None:
+        with self._lock:
+            if self._generations.get(endpoint, 0) != generation:
+                return
+            entries = self._entries.setdefault(endpoint, OrderedDict())
+            entries[key] = _Entry(value, time.monotonic())
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def _refresh(self, endpoint: str, key: Hashable, load: Callable[[], Any]) -> None:
+        with self._lock:
+            generation = self._generations.get(endpoint, 0)
+        try:
+            self._store(endpoint, key, load(), generation)
+        except Exception:
+            logger.warning("Background refresh of %s failed", endpoint, exc_info=True)
+            with self._lock:
+                self.stats["refresh_errors"] += 1
+                entry = self._entries.get(endpoint, {}).get(key)
+                if entry is not None:
+                    entry.refresh_failed = True
+        finally:
+            with self._lock:
+                self._refreshing.discard((endpoint, key))
+
+    def invalidate(self, *endpoints: str) -> None:
+        with self._lock:
+            for endpoint in endpoints:
+                self._entries.pop(endpoint, None)
+                self._generations[endpoint] = self._generations.get(endpoint, 0) + 1
+
+    def on_change(self, event: dict[str, Any]) -> None:
+        """Écouteur du flux de changements"""
+        self.invalidate(*INVALIDATED_BY.get(event["topic"], ()))
+
+
+read_cache = ReadCache()
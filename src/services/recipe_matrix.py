@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+
+class RecipeMatrix:
+    """Cache en mémoire de recipes_ingredients : recipe_id -> {sku: quantité},
+    avec sa forme creuse (recettes x ingredients) construite à la demande.
+
+    Rechargé après ``ttl`` secondes ou dès qu'une recette est modifiée.
+    """
+
+    def __init__(self, ttl: float = 300) -> None:
+        self.ttl = ttl
+        self.loaded_at: float | None = None
+        self._recipes: dict[int, dict[str, float]] = {}
+        self._sparse: tuple[sparse.csr_matrix, list[int], dict[str, int]] | None = None
+        self._lock = Lock()
+
+    def is_fresh(self) -> bool:
+        return (
+            self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+        )
+
+    def load(self, rows: list[dict[str, Any]]) -> None:
+        recipes: dict[int, dict[str, float]] = defaultdict(dict)
+        for x in rows:
+            recipes[x["recipe_id"]][x["ingredient_sku"]] = x["quantity_being_used"] or 0
+        with self._lock:
+            self._recipes = dict(recipes)
+            self._sparse = None
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.loaded_at = None
+
+    def ingredients(self, recipe_id: int) -> dict[str, float] | None:
+        with self._lock:
+            return self._recipes.get(recipe_id)
+
+    def as_sparse(self) -> tuple[sparse.csr_matrix, list[int], dict[str, int]]:
+        """Matrice creuse recettes x ingredients des quantités utilisées.
+
+        Retourne la matrice, les recipe_id par ligne et l'index des SKU par colonne.
+        """
+        # scipy n'est chargé qu'à la première simulation de coûts
+        from scipy import sparse
+
+        with self._lock:
+            if self._sparse is None:
+                recipe_ids = sorted(self._recipes)
+                skus = sorted({sku for x in self._recipes.values() for sku in x})
+                sku_index = {sku: j for j, sku in enumerate(skus)}
+                rows, cols, quantities = [], [], []
+                for i, recipe_id in enumerate(recipe_ids):
+                    for sku, quantity in self._recipes[recipe_id].items():
+                        rows.append(i)
+                        cols.append(sku_index[sku])
+                        quantities.append(quantity)
+                matrix = sparse.csr_matrix(
+                    (np.array(quantities, dtype=np.float64), (rows, cols)),
+                    shape=(len(recipe_ids), len(skus)),
+                )
+                self._sparse = (matrix, recipe_ids, sku_index)
+            return self._sparse
+
+
+recipe_matrix = RecipeMatrix()
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+
+
+def _timestamps(values: list[str]) -> np.ndarray:
+    return np.array(
+        [datetime.fromisoformat(x).timestamp() for x in values], dtype=np.float64
+    )
+
+
+def _sku_positions(skus: np.ndarray, values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Position de chaque valeur dans le catalogue trié, et masque des SKU connus"""
+    if not values or not len(skus):
+        return np.zeros(0, dtype=np.intp), np.zeros(len(values), dtype=bool)
+    wanted = np.array([x or "" for x in values])
+    positions = np.searchsorted(skus, wanted)
+    clipped = np.minimum(positions, len(skus) - 1)
+    known = skus[clipped] == wanted
+    return clipped[known], known
+
+
+def compute_reorder_suggestions(
+    ingredients: list[dict[str, Any]],
+    usage: list[dict[str, Any]],
+    completed_orders: list[dict[str, Any]],
+    open_orders: list[dict[str, Any]],
+    window_days: float,
+    coverage_days: float,
+    default_lead_time_days: float,
+) -> list[dict[str, Any]]:
+    """Calcule les quantités à commander pour tout le catalogue en une passe.
+
+    point de commande = consommation/jour * délai + min_stock_level
+    quantité = point de commande + consommation/jour * couverture - (stock + en commande)
+    """
+    if not ingredients:
+        return []
+    ingredients = sorted(ingredients, key=lambda x: x["sku"])
+    n = len(ingredients)
+    skus = np.array([x["sku"] for x in ingredients])
+    stock = np.array(
+        [x["current_stock_level"] or 0 for x in ingredients], dtype=np.float64
+    )
+    minimum = np.array(
+        [x["min_stock_level"] or 0 for x in ingredients], dtype=np.float64
+    )
+    unit_cost = np.array([x["unit_cost"] or 0 for x in ingredients], dtype=np.float64)
+
+    # Consommation journalière (recipe_usage + waste) sur la fenêtre
+    idx, known = _sku_positions(skus, [x["ingredient_sku"] for x in usage])
+    quantities = np.abs(
+        np.array([x["quantity_change"] or 0 for x in usage], dtype=np.float64)
+    )[known]
+    daily_usage = np.bincount(idx, weights=quantities, minlength=n) / window_days
+
+    # Délai moyen observé entre created_at et completed_at
+    idx, known = _sku_positions(skus, [x["ingredient_id"] for x in completed_orders])
+    lead_times = (
+        _timestamps([x["completed_at"] for x in completed_orders])
+        - _timestamps([x["created_at"] for x in completed_orders])
+    )[known] / 86400
+    lead_sums = np.bincount(idx, weights=np.maximum(lead_times, 0), minlength=n)
+    lead_counts = np.bincount(idx, minlength=n)
+    lead_time = np.full(n, default_lead_time_days, dtype=np.float64)
+    observed = lead_counts > 0
+    lead_time[observed] = lead_sums[observed] / lead_counts[observed]
+
+    # Quantités déjà commandées et non reçues
+    idx, known = _sku_positions(skus, [x["ingredient_id"] for x in open_orders])
+    ordered = np.array(
+        [x["quantity_ordered"] or 0 for x in open_orders], dtype=np.float64
+    )[known]
+    on_order = np.bincount(idx, weights=ordered, minlength=n)
+
+    position = stock + on_order
+    reorder_point = daily_usage * lead_time + minimum
+    target = reorder_point + daily_usage * coverage_days
+    suggested = np.where(position <= reorder_point, np.maximum(target - position, 0), 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(daily_usage > 0, stock / daily_usage, np.inf)
+
+    selected = np.flatnonzero(suggested > 0)
+    selected = selected[np.argsort(days_left[selected], kind="stable")]
+    return [
+        {
+            "sku": ingredients[i]["sku"],
+            "name": ingredients[i].get("name"),
+            "current_stock_level": float(stock[i]),
+            "min_stock_level": float(minimum[i]),
+            "on_order": float(on_order[i]),
+            "daily_usage": float(daily_usage[i]),
+            "lead_time_days": float(lead_time[i]),
+            "days_of_stock_left": (
+                float(days_left[i]) if np.isfinite(days_left[i]) else None
+            ),
+            "reorder_point": float(reorder_point[i]),
+            "suggested_quantity": float(suggested[i]),
+            "estimated_cost": float(suggested[i] * unit_cost[i]),
+        }
+        for i in selected
+    ]
@@ -0,0 +1,166 @@
+import logging
+import time
+from threading import Lock
+from typing import Any, Callable, TypeVar
+
+import httpx
+
+from src.core import metrics, tracing
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+UPSTREAMS = ("postgrest", "gotrue", "storage")
+# Codes HTTP et classes SQLSTATE qui signalent une panne passagère
+TRANSIENT_STATUSES = {"408", "429", "502", "503", "504"}
+TRANSIENT_SQLSTATES = ("08", "53", "57P")
+
+
+class CircuitOpenError(Exception):
+    """L'amont est considéré hors service, l'appel n'est pas tenté"""
+
+    def __init__(self, upstream: str, retry_after: float) -> None:
+        super().__init__(f"{upstream} indisponible, réessayez dans {retry_after:.0f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+def is_transient(exc: Exception) -> bool:
+    """Erreur réseau ou 5xx de passerelle, par opposition à une erreur métier"""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    for attr in ("status", "status_code", "code"):
+        value = getattr(exc, attr, None)
+        if value is None:
+            continue
+        value = str(value)
+        if value in TRANSIENT_STATUSES or value.startswith(TRANSIENT_SQLSTATES):
+            return True
+    return False
+
+
+class CircuitBreaker:
+    """Disjoncteur fermé / ouvert / semi-ouvert pour un amont.
+
+    Après ``failure_threshold`` échecs passagers consécutifs, il s'ouvre et
+    rejette immédiatement pendant ``reset_seconds`` ; un seul appel d'essai
+    passe ensuite, et sa réussite referme le circuit.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._lock = Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(self.reset_seconds - elapsed, 1))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuit %s closed", self.name)
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_neutral(self) -> None:
+        """Erreur métier : l'amont a répondu, sans rien prouver sur sa santé"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(
+                        "Circuit %s opened after %d failures", self.name, self.failures
+                    )
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+class Resilience:
+    """Timeouts, réessais et disjoncteurs partagés par les appels Supabase"""
+
+    def __init__(self) -> None:
+        self.retries = 2
+        self.breakers = {name: CircuitBreaker(name) for name in UPSTREAMS}
+        metrics.register("circuit_breakers", self.snapshot)
+
+    def configure(self, config: Config) -> None:
+        self.retries = config.SUPABASE_RETRIES
+        for breaker in self.breakers.values():
+            breaker.failure_threshold = config.CIRCUIT_FAILURE_THRESHOLD
+            breaker.reset_seconds = config.CIRCUIT_RESET_SECONDS
+
+    def call(
+        self,
+        upstream: str,
+        fn: Callable[[], T],
+        idempotent: bool = False,
+        label: str | None = None,
+    ) -> T:
+        """Exécute ``fn`` derrière le disjoncteur de ``upstream``.
+
+        Seuls les appels idempotents sont réessayés, sans attente : l'appel
+        tourne dans un thread de requête qu'un sommeil bloquerait, et le
+        disjoncteur coupe court si l'amont reste en panne. Les erreurs métier
+        (4xx, contraintes) ne comptent ni comme pannes ni comme réussites.
+        Chaque tentative est comptée dans la trace de la requête sous ``label``.
+        """
+        breaker = self.breakers[upstream]
+        label = label or upstream
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            breaker.before_call()
+            started = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as exc:
+                tracing.record(upstream, label, time.perf_counter() - started)
+                if not is_transient(exc):
+                    breaker.record_neutral()
+                    raise
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                continue
+            tracing.record(upstream, label, time.perf_counter() - started)
+            breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def snapshot(self) -> dict[str, Any]:
+        return {name: x.snapshot() for name, x in self.breakers.items()}
+
+
+resilience = Resilience()
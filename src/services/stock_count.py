@@ -0,0 +1,72 @@
+from typing import Any
+
+import numpy as np
+
+
+def compute_stock_count(
+    ingredients: list[dict[str, Any]], counts: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Écarts d'une feuille d'inventaire face au stock courant, en une passe.
+
+    Lève ValueError si un SKU est compté deux fois ou inconnu. Les lignes sont
+    triées par écart de valeur décroissant (en absolu).
+    """
+    wanted = np.array([x["sku"] for x in counts], dtype=str)
+    counted = np.array([x["counted"] for x in counts], dtype=np.float64)
+
+    unique, occurrences = np.unique(wanted, return_counts=True)
+    if (occurrences > 1).any():
+        duplicates = ", ".join(unique[occurrences > 1])
+        raise ValueError(f"SKU comptés plusieurs fois : {duplicates}")
+
+    skus = np.array([x["sku"] for x in ingredients], dtype=str)
+    if len(skus):
+        # Tri local : l'ordre de la base dépend de sa collation, searchsorted
+        # suppose l'ordre des points de code
+        by_sku = np.argsort(skus, kind="stable")
+        found = np.minimum(np.searchsorted(skus[by_sku], wanted), len(skus) - 1)
+        positions = by_sku[found]
+        known = skus[positions] == wanted
+    else:
+        positions = np.zeros(len(wanted), dtype=np.intp)
+        known = np.zeros(len(wanted), dtype=bool)
+    if not known.all():
+        raise ValueError(f"SKU inconnus : {', '.join(wanted[~known])}")
+
+    rows = [ingredients[i] for i in positions]
+    expected = np.array(
+        [x["current_stock_level"] or 0 for x in rows], dtype=np.float64
+    )
+    unit_cost = np.array([x["unit_cost"] or 0 for x in rows], dtype=np.float64)
+
+    variance = counted - expected
+    value_delta = variance * unit_cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance_pct = np.where(expected != 0, variance / expected * 100, np.nan)
+
+    lines = [
+        {
+            "sku": rows[i]["sku"],
+            "name": rows[i].get("name"),
+            "unit": rows[i].get("unit"),
+            "expected": float(expected[i]),
+            "counted": float(counted[i]),
+            "variance": float(variance[i]),
+            "variance_pct": (
+                None if np.isnan(variance_pct[i]) else round(float(variance_pct[i]), 2)
+            ),
+            "unit_cost": float(unit_cost[i]),
+            "value_delta": round(float(value_delta[i]), 2),
+        }
+        for i in np.argsort(-np.abs(value_delta), kind="stable")
+    ]
+    return {
+        "lines": lines,
+        "totals": {
+            "counted": len(lines),
+            "changed": int(np.count_nonzero(variance)),
+            "shrinkage_value": round(float(-value_delta[value_delta < 0].sum()), 2),
+            "surplus_value": round(float(value_delta[value_delta > 0].sum()), 2),
+            "net_value_delta": round(float(value_delta.sum()), 2),
+        },
+    }
@@ -1,6 +1,62 @@
+from src.services.alert_scheduler import alert_scheduler
+from src.services.batch_index import batch_index
+from src.services.change_feed import change_feed
+from src.services.dashboard_summary import dashboard_summary
+from src.services.forecast import demand_forecast
+from src.services.stock_count import compute_stock_count
 from src.services.supabase_services.supabase_service import SupabaseService
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any
+import base64
+import json
+
+ADJUSTMENT_HISTORY_COLUMNS = (
+    "id, created_at, adjustment_type, quantity_change, cost_impact, reason, "
+    "waste_category, adjusted_by, order_id, recipe_id"
+)
+# Les ajustements qui sortent du stock en FEFO (voir la RPC record_adjustment)
+FEFO_ADJUSTMENT_TYPES = {"recipe_usage", "waste"}
+ORDER_HISTORY_COLUMNS = (
+    "id, created_at, status, quantity_ordered, quantity_received, "
+    "value_ordered, value_received, completed_at"
+)
+STOCK_COUNT_COLUMNS = (
+    "sku, name, unit, current_stock_level, min_stock_level, unit_cost, "
+    "expire_at, delete"
+)
+
+
+def _encode_cursor(movement: dict[str, Any]) -> str:
+    position = [movement["created_at"], movement["source"], movement["id"]]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str, int]:
+    """(created_at, source, id) du dernier mouvement de la page précédente"""
+    try:
+        created_at, source, row_id = json.loads(base64.urlsafe_b64decode(cursor))
+        datetime.fromisoformat(created_at)
+        return created_at, source, int(row_id)
+    except Exception:
+        raise ValueError("Curseur d'historique invalide")
+
+
+def _after_cursor(query, source: str, cursor: tuple[str, str, int]):
+    """Lignes de ``source`` qui suivent le curseur dans l'ordre de l'historique.
+
+    L'ordre est (created_at, source, id) décroissant : à created_at égal, les
+    commandes passent avant les ajustements. Les productions et inventaires
+    insèrent de nombreuses lignes au même instant, d'où le départage par id.
+    """
+    created_at, cursor_source, row_id = cursor
+    if source == cursor_source:
+        return query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{row_id})'
+        )
+    if source == "adjustment":
+        return query.lte("created_at", created_at)
+    return query.lt("created_at", created_at)
 
 
 class IngredientService(SupabaseService):
@@ -15,11 +71,12 @@ class IngredientService(SupabaseService):
         category: str | None = None,
         status: str | None = None,
         low_stock_only: bool | None = False,
+        columns: str = "*",
     ) -> dict[str, Any] | None:
         """Récupère la liste des ingrédients avec pagination et filtres dynamiques"""
         offset = (page - 1) * limit
         # Base query
-        query = self.client.table("ingredients").select("*", count="exact")
+        query = self.client.table("ingredients").select(columns, count="exact")
         query = query.eq("delete", False)
         # Filtre par catégorie
         if category:
@@ -43,7 +100,7 @@ class IngredientService(SupabaseService):
             },
         )
         # Pagination
-        response = query.range(offset, offset + limit - 1).execute()
+        response = self.execute(query.range(offset, offset + limit - 1))
         if not response:
             return None
         total = response.count or 0
@@ -58,79 +115,396 @@ class IngredientService(SupabaseService):
             },
         }
 
-    def get_ingredient(self, sku: str):
-        result = (
+    def _notify_change(
+        self, action: str, ingredient: dict[str, Any], changed: dict[str, Any]
+    ) -> None:
+        """Propage une écriture aux alertes, au tableau de bord et au flux"""
+        alert_scheduler.observe(ingredient)
+        dashboard_summary.observe_ingredient(ingredient)
+        sku = ingredient.get("sku") if isinstance(ingredient, dict) else None
+        change_feed.publish("ingredients", action, sku or changed.get("sku"), changed)
+
+    def get_ingredient(self, sku: str, columns: str = "*"):
+        result = self.execute(
             self.client.table("ingredients")
-            .select("*")
+            .select(columns)
             .eq("sku", sku)
             .single()
-            .execute()
         )
         return result.data
 
     def create_ingredient(self, data: dict[str, Any]):
         update_dict = {k: v for k, v in data.items() if v is not None}
-        result = self.client.table("ingredients").insert(update_dict).execute()
+        result = self.execute(self.client.table("ingredients").insert(update_dict))
         if result.data:
+            self._notify_change("created", result.data[0], result.data[0])
             return result.data[0]
 
-    def update_ingredient(self, sku: str, data: dict[str, Any]):
+    def update_ingredient(
+        self,
+        sku: str,
+        data: dict[str, Any],
+        version: dict[str, Any] | None = None,
+    ):
         update_dict = {k: v for k, v in data.items() if v is not None}
         update_dict["last_updated"] = datetime.now().isoformat()
-        result = (
-            self.client.table("ingredients")
-            .update(update_dict)
-            .eq("sku", sku)
-            .execute()
-        )
+        query = self.client.table("ingredients").update(update_dict).eq("sku", sku)
+        result = self.execute(self.match_version(query, version))
         if result.data:
+            self._notify_change("updated", result.data[0], update_dict)
             return result.data[0]
 
     def adjust_ingredient(self, sku: str, quantity: int):
         """AJouter au stock"""
-        result = self.client.rpc(
-            "add_quantity_to_ingredient",
-            {"p_product_sku": sku, "p_quantity_to_add": quantity},
-        ).execute()
+        result = self.execute(
+            self.client.rpc(
+                "add_quantity_to_ingredient",
+                {"p_product_sku": sku, "p_quantity_to_add": quantity},
+            )
+        )
         if result.data:
+            self._notify_change(
+                "updated",
+                result.data[0],
+                {"sku": sku, "current_stock_level_delta": quantity},
+            )
             return result.data[0]
 
     def delete_ingredient(self, sku: str):
         """Suppression logique → delete=True"""
         data = {"delete": True, "last_updated": datetime.now().isoformat()}
-        result = self.client.table("ingredients").update(data).eq("sku", sku).execute()
+        result = self.execute(
+            self.client.table("ingredients").update(data).eq("sku", sku)
+        )
         if result.data:
+            self._notify_change("deleted", result.data[0], data)
             return result.data[0]
 
     def adjust_stock(self, adjust_dict: dict[str, Any]):
         """Ajuste rapidement le stock"""
         update_dict = {k: v for k, v in adjust_dict.items() if v is not None}
-        result = self.client.table("stock_adjustments").insert(update_dict).execute()
-        if result.data:
-            return result.data[0]
+        # Ajustement et consommation FEFO des lots (recipe_usage, waste) dans
+        # la même transaction : un échec n'enregistre ni l'un ni l'autre
+        result = self.execute(
+            self.client.rpc("record_adjustment", {"p_adjustment": update_dict})
+        )
+        if update_dict.get("adjustment_type") in FEFO_ADJUSTMENT_TYPES:
+            batch_index.invalidate(update_dict["ingredient_sku"])
+        if update_dict.get("adjustment_type") == "waste":
+            dashboard_summary.observe_waste(update_dict.get("cost_impact"))
+        if update_dict.get("adjustment_type") == "recipe_usage":
+            demand_forecast.record(
+                update_dict["ingredient_sku"], update_dict["quantity_change"]
+            )
+        adjustment = (result.data or {}).get("adjustment")
+        if adjustment:
+            change_feed.publish(
+                "ingredients",
+                "updated",
+                update_dict["ingredient_sku"],
+                {"current_stock_level_delta": update_dict["quantity_change"]},
+            )
+            return adjustment
+
+    def record_stock_count(
+        self,
+        lines: list[dict[str, Any]],
+        counted_by: str | None = None,
+        notes: str | None = None,
+        dry_run: bool = False,
+    ) -> dict[str, Any]:
+        """Inventaire complet : écarts, ajustements manual_count et nouveaux niveaux"""
+        ingredients = self.fetch_all(
+            lambda: self.client.table("ingredients")
+            .select(STOCK_COUNT_COLUMNS)
+            .eq("delete", False)
+            .order("sku")
+        )
+        report = compute_stock_count(ingredients, lines)
+        report["dry_run"] = dry_run
+        changed = [x for x in report["lines"] if x["variance"] != 0]
+        if dry_run or not changed:
+            report["adjustments"] = []
+            return report
+
+        # cost_impact garde le signe de quantity_change, comme pour "received" :
+        # négatif pour une démarque, positif pour un surplus
+        result = self.execute(
+            self.client.rpc(
+                "record_stock_count",
+                {
+                    "p_counts": [
+                        {
+                            "sku": x["sku"],
+                            "expected": x["expected"],
+                            "counted": x["counted"],
+                            "cost_impact": x["value_delta"],
+                        }
+                        for x in changed
+                    ],
+                    "p_adjusted_by": counted_by,
+                    "p_notes": notes,
+                },
+            )
+        )
+        report["adjustments"] = result.data or []
+
+        by_sku = {x["sku"]: x for x in ingredients}
+        for line in changed:
+            ingredient = by_sku[line["sku"]]
+            ingredient["current_stock_level"] = line["counted"]
+            ingredient["value"] = line["counted"] * line["unit_cost"]
+            self._notify_change(
+                "updated",
+                ingredient,
+                {
+                    "current_stock_level": line["counted"],
+                    "current_stock_level_delta": line["variance"],
+                },
+            )
+        return report
 
     def search_ingredient(self, keyword: str):
         """Search for an ingredients"""
-        results = self.client.rpc(
-            "search_ingredients", params={"search_term": keyword}
-        ).execute()
+        results = self.execute(
+            self.client.rpc(
+                "search_ingredients", params={"search_term": keyword}
+            )
+        )
         if results.data:
             return results.data
 
-    # placeholders
-    def get_history(self, sku: str):
-        return []
+    def _history_query(
+        self,
+        table: str,
+        columns: str,
+        sku_column: str,
+        sku: str,
+        start: str | None,
+        end: str | None,
+    ):
+        query = self.client.table(table).select(columns).eq(sku_column, sku)
+        if table == "orders":
+            query = query.eq("delete", False)
+        if start:
+            query = query.gte("created_at", start)
+        if end:
+            query = query.lte("created_at", end)
+        return query
+
+    def _adjustment_movement(self, row: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "source": "adjustment",
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "type": row["adjustment_type"],
+            "quantity": row["quantity_change"],
+            "cost": row["cost_impact"],
+            "details": {
+                "reason": row["reason"],
+                "waste_category": row["waste_category"],
+                "adjusted_by": row["adjusted_by"],
+                "order_id": row["order_id"],
+                "recipe_id": row["recipe_id"],
+            },
+        }
+
+    def _order_movement(self, row: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "source": "order",
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "type": "order",
+            "quantity": row["quantity_ordered"],
+            "cost": row["value_ordered"],
+            "details": {
+                "status": row["status"],
+                "quantity_received": row["quantity_received"],
+                "value_received": row["value_received"],
+                "completed_at": row["completed_at"],
+            },
+        }
+
+    def get_history(
+        self,
+        sku: str,
+        cursor: str | None = None,
+        limit: int = 50,
+        adjustment_type: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> dict[str, Any]:
+        """Historique des mouvements (ajustements + commandes) par curseur"""
+        position = _decode_cursor(cursor) if cursor else None
+        query = self._history_query(
+            "stock_adjustments",
+            ADJUSTMENT_HISTORY_COLUMNS,
+            "ingredient_sku",
+            sku,
+            start,
+            end,
+        )
+        if position:
+            query = _after_cursor(query, "adjustment", position)
+        if adjustment_type:
+            query = query.eq("adjustment_type", adjustment_type)
+        result = self.execute(
+            query.order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
+        )
+        movements = [self._adjustment_movement(x) for x in result.data]
+
+        # Les commandes n'ont pas de type d'ajustement
+        if not adjustment_type:
+            query = self._history_query(
+                "orders",
+                ORDER_HISTORY_COLUMNS,
+                "ingredient_id",
+                sku,
+                start,
+                end,
+            )
+            if position:
+                query = _after_cursor(query, "order", position)
+            result = self.execute(
+                query.order("created_at", desc=True)
+                .order("id", desc=True)
+                .limit(limit + 1)
+            )
+            movements.extend(self._order_movement(x) for x in result.data)
+
+        movements.sort(
+            key=lambda x: (
+                datetime.fromisoformat(x["created_at"]),
+                x["source"],
+                x["id"],
+            ),
+            reverse=True,
+        )
+        page = movements[:limit]
+        has_next = len(movements) > limit
+        return {
+            "sku": sku,
+            "data": page,
+            "next_cursor": _encode_cursor(page[-1]) if has_next else None,
+        }
+
+    def get_history_aggregate(
+        self,
+        sku: str,
+        interval: str,
+        adjustment_type: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> dict[str, Any]:
+        """Mouvements regroupés par heure, jour ou semaine, agrégés côté base"""
+        # Fonction stable appelée en GET : les paramètres absents sont omis de
+        # l'URL plutôt que transmis vides
+        params = {
+            "p_sku": sku,
+            "p_interval": interval,
+            "p_adjustment_type": adjustment_type,
+            "p_start": start,
+            "p_end": end,
+        }
+        result = self.execute(
+            self.client.rpc(
+                "ingredient_history_aggregate",
+                {k: v for k, v in params.items() if v is not None},
+                get=True,
+            )
+        )
+        return {"sku": sku, "interval": interval, "data": result.data}
+
+    # -------------------BATCHES (FEFO)-------------------------
+    def _load_batches(self, sku: str) -> None:
+        """Charge les lots ouverts du SKU dans l'index s'il est périmé"""
+        if batch_index.is_loaded(sku):
+            return
+        result = self.execute(
+            self.client.table("ingredient_batches")
+            .select("*")
+            .eq("ingredient_sku", sku)
+            .gt("quantity_remaining", 0)
+        )
+        batch_index.load(sku, result.data)
+
+    def receive_batch(
+        self,
+        sku: str,
+        quantity: float,
+        order_id: int | None = None,
+        expire_at: str | None = None,
+    ):
+        """Crée un lot à la réception d'une commande"""
+        lot = {
+            "ingredient_sku": sku,
+            "order_id": order_id,
+            "quantity_received": quantity,
+            "quantity_remaining": quantity,
+            "expire_at": expire_at,
+            "received_at": datetime.now().isoformat(),
+        }
+        # Un seul lot par commande, même si la réception est rejouée
+        result = self.execute(
+            self.client.table("ingredient_batches")
+            .upsert(lot, on_conflict="order_id", ignore_duplicates=True)
+        )
+        if result.data:
+            batch_index.add(result.data[0])
+            return result.data[0]
+
+    def get_batches(self, sku: str, expiring_within_days: int | None = None):
+        """Lots ouverts triés par date d'expiration (FEFO)"""
+        self._load_batches(sku)
+        if expiring_within_days is not None:
+            before = datetime.now() + timedelta(days=expiring_within_days)
+            batches = batch_index.expiring(sku, before)
+        else:
+            batches = batch_index.lots(sku)
+        return {
+            "sku": sku,
+            "batches": batches,
+            "total_remaining": sum(x["quantity_remaining"] for x in batches),
+        }
+
+    # -------------------FORECAST-------------------------
+    def _fit_forecast(self) -> None:
+        """(Ré)ajuste les modèles de demande si le cache est périmé"""
+        if not demand_forecast.needs_refit():
+            return
+        since = (datetime.now() - timedelta(days=demand_forecast.history_days)).date()
+        usage = self.fetch_all(
+            lambda: self.client.table("stock_adjustments")
+            .select("ingredient_sku, quantity_change, created_at")
+            .eq("adjustment_type", "recipe_usage")
+            .gte("created_at", since.isoformat())
+            .order("id")
+        )
+        demand_forecast.fit(usage)
 
-    def get_batches(self, sku: str):
-        return []
+    def get_forecast(self, sku: str, horizon_days: int = 30):
+        """Prévision de consommation et date de rupture projetée, None si le
+        SKU est inconnu"""
+        result = self.execute(
+            self.client.table("ingredients")
+            .select("current_stock_level")
+            .eq("sku", sku)
+            .limit(1)
+        )
+        if not result.data:
+            return None
+        self._fit_forecast()
+        stock = result.data[0]["current_stock_level"] or 0
+        return demand_forecast.projection(sku, stock, horizon_days)
 
     def get_recipes(self, sku: str):
         """Get the recipes that uses this ingredient"""
-        results = (
+        results = self.execute(
             self.client.table("recipes_ingredients")
             .select("*, recipes(name, cost, category, id)")
             .eq("ingredient_sku", sku)
-            .execute()
         )
         recipes = []
         for ingredient in results.data:
@@ -1,6 +1,11 @@
 # order_service.py
 
-import datetime
+from datetime import datetime, timedelta
+from src.services.alert_scheduler import alert_scheduler
+from src.services.batch_index import batch_index
+from src.services.change_feed import change_feed
+from src.services.dashboard_summary import dashboard_summary
+from src.services.reorder import compute_reorder_suggestions
 from src.services.supabase_services.supabase_service import SupabaseService
 from typing import Any
 
@@ -17,9 +22,10 @@ class OrdersService(SupabaseService):
         completed_at: str | None = None,
         page: int = 1,
         limit: int = 10,
+        columns: str = "*, ingredients(*)",
     ) -> dict[str, Any] | None:
         """Récupère la liste des commandes avec filtres et pagination"""
-        query = self.client.table("orders").select("*, ingredients(*)", count="exact")
+        query = self.client.table("orders").select(columns, count="exact")
         # Application des filtres
         query = query.eq("delete", False)
         if status:
@@ -35,7 +41,7 @@ class OrdersService(SupabaseService):
         # Calcul de l'offset pour la pagination
         offset = (page - 1) * limit
         # Exécution de la requête unique avec pagination
-        response = query.range(offset, offset + limit - 1).execute()
+        response = self.execute(query.range(offset, offset + limit - 1))
 
         # Vérification de la réponse
         if not response:
@@ -59,65 +65,187 @@ class OrdersService(SupabaseService):
         # Insertion de la commande
         order_dict = {k: v for k, v in order_data.items() if v is not None}
         print(order_dict)
-        order_response = self.client.table("orders").insert(order_dict).execute()
+        order_response = self.execute(self.client.table("orders").insert(order_dict))
         # Récupération de la commande créée
         result = order_response.data
         if result:
+            self._notify_change("created", result[0], result[0])
             return result[0]
 
-    def get_order_by_id(self, order_id: int) -> dict[str, Any] | None:
+    def _notify_change(
+        self, action: str, order: dict[str, Any], changed: dict[str, Any]
+    ) -> None:
+        """Propage une écriture au tableau de bord et au flux de changements"""
+        dashboard_summary.observe_order(order)
+        change_feed.publish("orders", action, order["id"], changed)
+
+    def get_order_by_id(
+        self, order_id: int, columns: str = "*, ingredients(*)"
+    ) -> dict[str, Any] | None:
         """Récupère une commande par son ID avec l'ingrédient"""
-        response = (
+        response = self.execute(
             self.client.table("orders")
-            .select("*, ingredients(*)")
+            .select(columns)
             .eq("id", order_id)
             .eq("delete", False)
             .single()
-            .execute()
         )
         if response.data:
             return response.data
 
     def update_order(
-        self, order_id: int, update_data: dict[str, Any]
+        self,
+        order_id: int,
+        update_data: dict[str, Any],
+        version: dict[str, Any] | None = None,
     ) -> dict[str, Any] | None:
         """Met à jour une commande existante"""
         update_dict = {k: v for k, v in update_data.items() if v is not None}
         update_dict["last_updated"] = datetime.now().isoformat()
 
         if update_dict:
-            response = (
-                self.client.table("orders")
-                .update(update_dict)
-                .eq("id", order_id)
-                .execute()
-            )
+            query = self.client.table("orders").update(update_dict).eq("id", order_id)
+            response = self.execute(self.match_version(query, version))
             if response.data:
+                self._notify_change("updated", response.data[0], update_dict)
                 return response.data[0]
 
+    def receive_orders(
+        self, lines: list[dict[str, Any]], received_by: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Réceptionne plusieurs commandes en une seule transaction (RPC)"""
+        result = self.execute(
+            self.client.rpc(
+                "receive_orders",
+                {"p_lines": lines, "p_received_by": received_by},
+            )
+        )
+        orders = result.data or []
+        expiries = {x["order_id"]: x.get("expire_at") for x in lines}
+        # De nouveaux lots ont été créés côté base
+        for sku in {x["ingredient_id"] for x in orders}:
+            batch_index.invalidate(sku)
+        for order in orders:
+            self._notify_change("updated", order, order)
+            alert_scheduler.observe_stock_delta(
+                order["ingredient_id"],
+                order["quantity_received"] or 0,
+                expiries.get(order["id"]),
+            )
+            change_feed.publish(
+                "ingredients",
+                "updated",
+                order["ingredient_id"],
+                {"current_stock_level_delta": order["quantity_received"]},
+            )
+        # La valeur du stock reçu dépend du unit_cost, connu seulement en base
+        if orders:
+            dashboard_summary.request_rebuild()
+        return orders
+
     def soft_delete_order(self, order_id: int) -> dict[str, str] | None:
         """Effectue une suppression logique de la commande"""
         # Suppression logique
-        result = (
+        result = self.execute(
             self.client.table("orders")
-            .update({"delete": True, "status": "cancelled"})
+            .update(
+                {
+                    "delete": True,
+                    "status": "cancelled",
+                    "last_updated": datetime.now().isoformat(),
+                }
+            )
             .eq("id", order_id)
-            .execute()
         )
         if result.data:
+            self._notify_change(
+                "deleted", result.data[0], {"delete": True, "status": "cancelled"}
+            )
             return result.data[0]
 
     def get_ingredient_orders(self, sku: str, sort: str, limit: int):
         """Récupère les commandes d'un ingredient"""
         desc = True if sort == "descending" else False
-        response = (
+        response = self.execute(
             self.client.table("orders")
             .select("*")
             .eq("ingredient_id", sku)
             .eq("delete", False)
             .limit(limit)
             .order("created_at", desc=desc)
-            .execute()
         )
         if response.data:
             return response.data
+
+    def get_reorder_suggestions(
+        self,
+        window_days: int = 30,
+        coverage_days: int = 7,
+        default_lead_time_days: float = 2,
+    ) -> dict[str, Any]:
+        """Suggestions de réapprovisionnement pour tout le catalogue"""
+        since = (datetime.now() - timedelta(days=window_days)).isoformat()
+        lead_since = (datetime.now() - timedelta(days=window_days * 6)).isoformat()
+
+        ingredients = self.fetch_all(
+            lambda: self.client.table("ingredients")
+            .select("sku, name, current_stock_level, min_stock_level, unit_cost")
+            .eq("delete", False)
+            .order("sku")
+        )
+        usage = self.fetch_all(
+            lambda: self.client.table("stock_adjustments")
+            .select("ingredient_sku, quantity_change")
+            .in_("adjustment_type", ["recipe_usage", "waste"])
+            .gte("created_at", since)
+            .order("id")
+        )
+        completed_orders = self.fetch_all(
+            lambda: self.client.table("orders")
+            .select("ingredient_id, created_at, completed_at")
+            .eq("delete", False)
+            .eq("status", "completed")
+            .not_.is_("completed_at", "null")
+            .gte("created_at", lead_since)
+            .order("id")
+        )
+        open_orders = self.fetch_all(
+            lambda: self.client.table("orders")
+            .select("ingredient_id, quantity_ordered")
+            .eq("delete", False)
+            .in_("status", ["pending", "confirmed"])
+            .order("id")
+        )
+        suggestions = compute_reorder_suggestions(
+            ingredients,
+            usage,
+            completed_orders,
+            open_orders,
+            window_days=window_days,
+            coverage_days=coverage_days,
+            default_lead_time_days=default_lead_time_days,
+        )
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "window_days": window_days,
+            "coverage_days": coverage_days,
+            "data": suggestions,
+        }
+
+    def get_analytics(
+        self, start: str, end: str | None = None, period: str = "month"
+    ) -> dict[str, Any]:
+        """Dépenses et écarts commandé / reçu agrégés côté base (RPC)"""
+        # Fonction stable appelée en GET : execute la traite comme une lecture
+        # et la réessaie en cas de panne passagère
+        # En GET les paramètres passent dans l'URL : un None deviendrait
+        # "p_end=" et ferait échouer la conversion en timestamptz
+        params = {"p_start": start, "p_end": end, "p_period": period}
+        result = self.execute(
+            self.client.rpc(
+                "order_analytics",
+                {k: v for k, v in params.items() if v is not None},
+                get=True,
+            )
+        )
+        return result.data
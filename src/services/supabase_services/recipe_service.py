@@ -1,4 +1,12 @@
+from collections import defaultdict
 from datetime import datetime
+import numpy as np
+from src.services.alert_scheduler import alert_scheduler
+from src.services.batch_index import batch_index
+from src.services.change_feed import change_feed
+from src.services.dashboard_summary import dashboard_summary
+from src.services.forecast import demand_forecast
+from src.services.recipe_matrix import recipe_matrix
 from src.services.supabase_services.supabase_service import SupabaseService
 from typing import Any
 
@@ -15,9 +23,11 @@ class RecipeService(SupabaseService):
         search_query: str | None,
         page: int = 1,
         limit: int = 10,
+        include_ingredients: bool = False,
+        columns: str = "*",
     ) -> dict[str, Any] | None:
         """Récupère la liste des plats avec filtres et pagination"""
-        query = self.client.table(self.recipe_table).select("*", count="exact")
+        query = self.client.table(self.recipe_table).select(columns, count="exact")
         # Application des filtres
         query = query.eq("delete", False)
         if active != "all":
@@ -30,16 +40,23 @@ class RecipeService(SupabaseService):
         # Calcul de l'offset pour la pagination
         offset = (page - 1) * limit
         # Exécution de la requête unique avec pagination
-        response = query.range(offset, offset + limit - 1).execute()
+        response = self.execute(query.range(offset, offset + limit - 1))
 
         # Vérification de la réponse
         if not response.data:
             return None
 
+        data = response.data
+        if include_ingredients:
+            # Une seule requête in_() pour toute la page au lieu d'une par repat
+            ingredients = self.get_ingredients_of_recipes([x["id"] for x in data])
+            for recipe in data:
+                recipe["ingredients"] = ingredients.get(recipe["id"], [])
+
         # On s'assure que total est un entier
         total = response.count if response.count is not None else 0
         return {
-            "data": response.data,
+            "data": data,
             "requests": {
                 "total": total,
                 "page": page,
@@ -54,83 +71,108 @@ class RecipeService(SupabaseService):
         # Insertion de la commande
         update_dict = {k: v for k, v in recipe_data.items() if v is not None}
         recipe_response = (
-            self.client.table(self.recipe_table).insert(update_dict).execute()
+            self.execute(self.client.table(self.recipe_table).insert(update_dict))
         )
         # Récupération de la commande créée
         result = recipe_response.data
         if result:
+            change_feed.publish("recipes", "created", result[0]["id"], result[0])
             return result[0]
 
-    def get_recipe_by_id(self, recipe_id: int) -> dict[str, Any] | None:
+    def get_recipe_by_id(
+        self, recipe_id: int, columns: str = "*"
+    ) -> dict[str, Any] | None:
         """Récupère un repat par son ID"""
-        response = (
+        response = self.execute(
             self.client.table(self.recipe_table)
-            .select("*")
+            .select(columns)
             .eq("id", recipe_id)
             .eq("delete", False)
             .single()
-            .execute()
         )
         if response.data:
             return response.data
 
     def update_recipe(
-        self, recipe_id: int, update_data: dict[str, Any]
+        self,
+        recipe_id: int,
+        update_data: dict[str, Any],
+        version: dict[str, Any] | None = None,
     ) -> dict[str, Any] | None:
         """Met à jour un repat existante"""
         update_dict = {k: v for k, v in update_data.items() if v is not None}
         update_dict["last_updated"] = datetime.now().isoformat()
         if update_dict:
-            response = (
+            query = (
                 self.client.table(self.recipe_table)
                 .update(update_dict)
                 .eq("id", recipe_id)
-                .execute()
             )
+            response = self.execute(self.match_version(query, version))
             if response.data:
+                change_feed.publish("recipes", "updated", recipe_id, update_dict)
                 return response.data[0]
 
     def soft_delete_recipe(self, recipe_id: int) -> dict[str, str] | None:
         """Effectue une suppression logique de la repat"""
         # Suppression logique
-        result = (
+        result = self.execute(
             self.client.table(self.recipe_table)
             .update({"delete": True, "last_updated": datetime.now().isoformat()})
             .eq("id", recipe_id)
-            .execute()
         )
         if result.data:
+            change_feed.publish("recipes", "deleted", recipe_id, {"delete": True})
             return result.data[0]
 
-    def get_ingredients_of_recipe(self, recipe_id: int) -> dict[str, str]:
+    def _parse_recipe_ingredient(self, row: dict[str, Any]) -> dict[str, Any]:
+        """Met à plat une ligne de recipes_ingredients jointe à son ingredient"""
+        ingredient = row["ingredients"]
+        return {
+            "name": ingredient["name"],
+            "sku": ingredient["sku"],
+            "unit": ingredient["unit"],
+            "unit_cost": ingredient["unit_cost"],
+            "quantity": row["quantity_being_used"],
+        }
+
+    def get_ingredients_of_recipe(self, recipe_id: int) -> dict[str, Any]:
         """Récupère les ingredients d'un repat"""
-        result = (
+        result = self.execute(
             self.client.table("recipes_ingredients")
             .select("*, ingredients(name,sku,unit,unit_cost)")
             .eq("recipe_id", recipe_id)
-            .execute()
         )
         # Parse the output and match the ingredient correctly
-        response = result.data
-        ingredients = []
-        for x in response:
-            ingredient = x["ingredients"]
-            ingredients.append(
-                {
-                    "name": ingredient["name"],
-                    "sku": ingredient["sku"],
-                    "unit": ingredient["unit"],
-                    "unit_cost": ingredient["unit_cost"],
-                    "quantity": x["quantity_being_used"],
-                }
-            )
+        ingredients = [self._parse_recipe_ingredient(x) for x in result.data]
         return {"recipe_id": recipe_id, "ingredients": ingredients}
 
+    def get_ingredients_of_recipes(
+        self, recipe_ids: list[int]
+    ) -> dict[int, list[dict[str, Any]]]:
+        """Récupère les ingredients de plusieurs repats en une seule requête"""
+        grouped: dict[int, list[dict[str, Any]]] = {
+            recipe_id: [] for recipe_id in recipe_ids
+        }
+        if not grouped:
+            return grouped
+        result = self.execute(
+            self.client.table("recipes_ingredients")
+            .select("*, ingredients(name,sku,unit,unit_cost)")
+            .in_("recipe_id", list(grouped))
+        )
+        # Regroupement en mémoire par recipe_id
+        for x in result.data:
+            grouped.setdefault(x["recipe_id"], []).append(
+                self._parse_recipe_ingredient(x)
+            )
+        return grouped
+
     def add_ingredient_to_recipe(
         self, recipe_id: int, ingredient_sku: str, quantity: float
     ):
         """Add Ingredient to a recipe"""
-        response = (
+        response = self.execute(
             self.client.table("recipes_ingredients")
             .insert(
                 {
@@ -139,21 +181,159 @@ class RecipeService(SupabaseService):
                     "quantity_being_used": quantity,
                 }
             )
-            .execute()
         )
+        recipe_matrix.invalidate()
         if response.data:
+            change_feed.publish(
+                "recipes", "updated", recipe_id, {"ingredients": response.data}
+            )
             return response.data[0]
 
     def edit_ingredient_quantity(
         self, recipe_id: int, ingredient_sku: str, quantity: float
     ):
         """Edit the quantity of ingredient in recipe"""
-        response = (
+        response = self.execute(
             self.client.table("recipes_ingredients")
             .update({"quantity_being_used": quantity})
             .eq("recipe_id", recipe_id)
             .eq("ingredient_sku", ingredient_sku)
-            .execute()
         )
+        recipe_matrix.invalidate()
         if response.data:
+            change_feed.publish(
+                "recipes", "updated", recipe_id, {"ingredients": response.data}
+            )
             return response.data[0]
+
+    def _load_recipe_matrix(self) -> None:
+        """Recharge le cache recette -> ingredients s'il est périmé"""
+        if recipe_matrix.is_fresh():
+            return
+        rows = self.fetch_all(
+            lambda: self.client.table("recipes_ingredients")
+            .select("recipe_id, ingredient_sku, quantity_being_used")
+            .order("recipe_id")
+            .order("ingredient_sku")
+        )
+        recipe_matrix.load(rows)
+
+    def record_production(
+        self, items: list[dict[str, Any]], adjusted_by: str | None = None
+    ) -> dict[str, Any]:
+        """Déduit du stock les ingredients de plusieurs productions en une écriture"""
+        self._load_recipe_matrix()
+        usage: dict[tuple[int, str], float] = defaultdict(float)
+        for item in items:
+            ingredients = recipe_matrix.ingredients(item["recipe_id"])
+            if not ingredients:
+                raise ValueError(f"Recipe {item['recipe_id']} has no ingredients")
+            for sku, quantity in ingredients.items():
+                usage[(item["recipe_id"], sku)] += quantity * item["servings"]
+
+        result = self.execute(
+            self.client.rpc(
+                "record_production",
+                {
+                    "p_usages": [
+                        {"recipe_id": recipe_id, "ingredient_sku": sku, "quantity": q}
+                        for (recipe_id, sku), q in usage.items()
+                    ],
+                    "p_adjusted_by": adjusted_by,
+                },
+            )
+        )
+
+        deltas: dict[str, float] = defaultdict(float)
+        for (_, sku), quantity in usage.items():
+            deltas[sku] -= quantity
+        for sku, delta in deltas.items():
+            # Les lots ont été consommés côté base
+            batch_index.invalidate(sku)
+            alert_scheduler.observe_stock_delta(sku, delta)
+            demand_forecast.record(sku, delta)
+            change_feed.publish(
+                "ingredients", "updated", sku, {"current_stock_level_delta": delta}
+            )
+        # cost_impact = quantité * unit_cost, soit la baisse de valeur du stock
+        for adjustment in result.data or []:
+            dashboard_summary.observe_value_delta(
+                adjustment["ingredient_sku"], -(adjustment["cost_impact"] or 0)
+            )
+        return {"deltas": deltas, "adjustments": result.data}
+
+    def simulate_costs(
+        self, scenarios: list[dict[str, Any]], only_affected: bool = True
+    ) -> dict[str, Any]:
+        """Coût des recettes sous des unit_cost hypothétiques (un produit creux)"""
+        self._load_recipe_matrix()
+        matrix, recipe_ids, sku_index = recipe_matrix.as_sparse()
+        ingredients = self.fetch_all(
+            lambda: self.client.table("ingredients")
+            .select("sku, unit_cost")
+            .eq("delete", False)
+            .order("sku")
+        )
+        recipes = {
+            x["id"]: x
+            for x in self.fetch_all(
+                lambda: self.client.table(self.recipe_table)
+                .select("id, name, category, cost")
+                .eq("delete", False)
+                .order("id")
+            )
+        }
+
+        base = np.zeros(len(sku_index))
+        for x in ingredients:
+            if x["sku"] in sku_index:
+                base[sku_index[x["sku"]]] = x["unit_cost"] or 0
+
+        # Une colonne de coûts unitaires par scénario
+        costs = np.repeat(base[:, None], len(scenarios), axis=1)
+        changed = np.zeros((len(sku_index), len(scenarios)))
+        for k, scenario in enumerate(scenarios):
+            for sku, unit_cost in scenario["unit_costs"].items():
+                if sku not in sku_index:
+                    raise ValueError(f"Ingredient {sku} is not used by any recipe")
+                costs[sku_index[sku], k] = unit_cost
+                changed[sku_index[sku], k] = 1
+
+        current = matrix @ base
+        simulated = matrix @ costs
+        affected = (matrix @ changed) > 0
+
+        results = []
+        for k, scenario in enumerate(scenarios):
+            rows = (
+                np.flatnonzero(affected[:, k])
+                if only_affected
+                else range(len(recipe_ids))
+            )
+            recipes_out = []
+            for i in rows:
+                recipe = recipes.get(recipe_ids[i])
+                if recipe is None:
+                    continue
+                delta = simulated[i, k] - current[i]
+                recipes_out.append(
+                    {
+                        "id": recipe["id"],
+                        "name": recipe["name"],
+                        "category": recipe["category"],
+                        "current_cost": float(current[i]),
+                        "simulated_cost": float(simulated[i, k]),
+                        "delta": float(delta),
+                        "delta_pct": (
+                            float(delta / current[i] * 100) if current[i] else None
+                        ),
+                    }
+                )
+            results.append(
+                {
+                    "name": scenario["name"],
+                    "total_delta": sum(x["delta"] for x in recipes_out),
+                    "recipes": recipes_out,
+                }
+            )
+        return {"scenarios": results}
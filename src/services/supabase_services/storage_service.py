@@ -1,3 +1,4 @@
+from src.services.resilience import resilience
 from src.services.supabase_services.supabase_service import SupabaseService
 
 
@@ -27,9 +28,13 @@ class StorageService(SupabaseService):
         path_parts = [segment for segment in [safe_folder, filename] if segment]
         storage_path = "/".join(path_parts) or filename
 
-        upload_response = self.client.storage.from_(self.bucket).upload(
-            path=storage_path,
-            file=file_content,
+        upload_response = resilience.call(
+            "storage",
+            lambda: self.client.storage.from_(self.bucket).upload(
+                path=storage_path,
+                file=file_content,
+            ),
+            label=f"POST {self.bucket}",
         )
         # Gestion des erreurs d'upload
         error = getattr(upload_response, "error", None)
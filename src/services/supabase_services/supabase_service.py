@@ -1,23 +1,90 @@
+from typing import Any, Callable
+from urllib.parse import urlparse
 from supabase import (
     Client,
+    ClientOptions,
     create_client,
 )
-from src.core.config import Config
+from src.core.config import get_config
 from src.schemas import auth_schema
+from src.services.resilience import resilience
+
+
+def _request_line(query: Any) -> tuple[str | None, str]:
+    """Méthode HTTP et chemin relatif à /rest/v1 d'un builder PostgREST"""
+    # postgrest >= 2.2x range la requête préparée (RequestConfig, URL complète)
+    # dans .request ; les versions précédentes portent http_method / path
+    request = getattr(query, "request", None)
+    method = getattr(request, "http_method", None) or getattr(
+        query, "http_method", None
+    )
+    path = getattr(request, "path", None) or getattr(query, "path", None) or ""
+    path = urlparse(str(path)).path.split("/rest/v1", 1)[-1]
+    method = getattr(method, "value", method)
+    return (str(method).upper() if method else None), path
 
 
 class SupabaseService:
     def __init__(self) -> None:
-        self.config = Config()
+        self.config = get_config()
         self.client: Client = create_client(
-            self.config.SUPABASE_URL, self.config.SUPABASE_KEY
+            self.config.SUPABASE_URL,
+            self.config.SUPABASE_KEY,
+            options=ClientOptions(
+                postgrest_client_timeout=self.config.SUPABASE_TIMEOUT_SECONDS,
+                storage_client_timeout=self.config.STORAGE_TIMEOUT_SECONDS,
+            ),
         )
 
+    def execute(self, query: Any) -> Any:
+        """Exécute une requête PostgREST derrière le disjoncteur ``postgrest``.
+
+        Les lectures (GET/HEAD, y compris les RPC ``stable`` appelées avec
+        ``get=True``) sont réessayées en cas de panne passagère ; les
+        écritures, et toute requête dont la méthode est inconnue, ne le sont
+        jamais.
+        """
+        method, path = _request_line(query)
+        return resilience.call(
+            "postgrest",
+            query.execute,
+            idempotent=method in ("GET", "HEAD"),
+            label=f"{method or '?'} {path.lstrip('/')}",
+        )
+
+    def fetch_all(
+        self, build_query: Callable[[], Any], page_size: int = 1000
+    ) -> list[dict[str, Any]]:
+        """Récupère toutes les lignes d'une requête par pages successives"""
+        rows: list[dict[str, Any]] = []
+        offset = 0
+        while True:
+            # Une requête neuve par page, les builders PostgREST étant mutables
+            response = self.execute(
+                build_query().range(offset, offset + page_size - 1)
+            )
+            data = response.data or []
+            rows.extend(data)
+            if len(data) < page_size:
+                return rows
+            offset += page_size
+
+    def match_version(self, query: Any, version: dict[str, Any] | None) -> Any:
+        """Restreint une écriture à la version lue (concurrence optimiste)"""
+        if version is None:
+            return query
+        if version.get("last_updated") is None:
+            return query.is_("last_updated", "null")
+        return query.eq("last_updated", version["last_updated"])
+
     # -------------------AUTHENTICATION-------------------------
     def login(self, credentials: auth_schema.Login):
         """Login a user"""
-        response = self.client.auth.sign_in_with_password(
-            {"email": credentials.email, "password": credentials.password}
+        response = resilience.call(
+            "gotrue",
+            lambda: self.client.auth.sign_in_with_password(
+                {"email": credentials.email, "password": credentials.password}
+            ),
         )
         return response.session
 
@@ -26,11 +93,11 @@ class SupabaseService:
         _ = self.client.auth.set_session(
             refresh_data.access_token, refresh_data.refresh_token
         )
-        response = self.client.auth.refresh_session()
+        response = resilience.call("gotrue", self.client.auth.refresh_session)
         return response.session
 
     def logout(self, token: auth_schema.Token):
         """Logout a user"""
         _ = self.client.auth.set_session(token.access_token, token.refresh_token)
-        self.client.auth.sign_out()
+        resilience.call("gotrue", self.client.auth.sign_out)
         return {"detail": "User logged out"}
@@ -0,0 +1,76 @@
+-- Schéma de base tel qu'il existe dans le projet Supabase hébergé.
+-- Idempotent : sur le projet hébergé, marquer cette migration comme appliquée
+-- (supabase migration repair --status applied 20261019085900) ; en local elle
+-- crée les tables dont dépendent les migrations suivantes.
+create table if not exists public.ingredients (
+    sku text primary key,
+    name text not null,
+    created_at timestamptz not null default now(),
+    category text,
+    current_stock_level numeric default 0,
+    unit text,
+    status text,
+    min_stock_level numeric default 0,
+    storage_location text,
+    last_received timestamptz,
+    last_updated timestamptz,
+    unit_cost numeric default 0,
+    expire_at timestamptz,
+    delete boolean not null default false,
+    value numeric default 0
+);
+
+create table if not exists public.orders (
+    id bigint generated by default as identity primary key,
+    created_at timestamptz not null default now(),
+    ingredient_id text not null references public.ingredients (sku),
+    quantity_ordered numeric default 0,
+    quantity_received numeric default 0,
+    unit_price_ordered numeric default 0,
+    unit_price_received numeric default 0,
+    notes text,
+    status text not null default 'pending'
+        check (status in ('pending', 'confirmed', 'completed', 'cancelled')),
+    value_ordered numeric default 0,
+    value_received numeric default 0,
+    completed_at timestamptz,
+    last_updated timestamptz,
+    delete boolean not null default false
+);
+
+create table if not exists public.recipes (
+    id bigint generated by default as identity primary key,
+    created_at timestamptz not null default now(),
+    name text not null,
+    category text,
+    cost numeric not null default 0,
+    active boolean default true,
+    delete boolean not null default false,
+    last_updated timestamptz
+);
+
+create table if not exists public.recipes_ingredients (
+    id bigint generated by default as identity primary key,
+    created_at timestamptz not null default now(),
+    recipe_id bigint not null references public.recipes (id),
+    ingredient_sku text not null references public.ingredients (sku),
+    quantity_being_used numeric default 0
+);
+
+create table if not exists public.stock_adjustments (
+    id bigint generated by default as identity primary key,
+    created_at timestamptz not null default now(),
+    ingredient_sku text not null references public.ingredients (sku),
+    adjustment_type text not null
+        check (adjustment_type in ('waste', 'received', 'manual_count', 'recipe_usage')),
+    quantity_change numeric not null,
+    reason text,
+    waste_category text
+        check (waste_category in ('spoilage', 'preparation', 'dropped', 'expired')),
+    notes text,
+    evidence_url text,
+    cost_impact numeric default 0,
+    adjusted_by text,
+    order_id bigint references public.orders (id),
+    recipe_id bigint references public.recipes (id)
+);
@@ -0,0 +1,14 @@
+-- Lots d'ingrédients pour le suivi FEFO (un lot par commande reçue)
+create table if not exists public.ingredient_batches (
+    id bigint generated by default as identity primary key,
+    ingredient_sku text not null references public.ingredients (sku),
+    order_id bigint unique references public.orders (id),
+    quantity_received numeric not null default 0,
+    quantity_remaining numeric not null default 0,
+    expire_at timestamptz,
+    received_at timestamptz not null default now()
+);
+
+create index if not exists ingredient_batches_open_fefo_idx
+    on public.ingredient_batches (ingredient_sku, expire_at)
+    where quantity_remaining > 0;
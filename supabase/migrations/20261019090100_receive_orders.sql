@@ -0,0 +1,84 @@
+-- Réception groupée de commandes en une seule transaction :
+-- clôture des commandes, incrément du stock, last_received,
+-- ajustements "received" et création des lots FEFO.
+-- Erreurs métier : P0002 commande introuvable, 55000 commande déjà close.
+create or replace function public.receive_orders(
+    p_lines jsonb,
+    p_received_by text default null
+)
+returns setof public.orders
+language plpgsql
+as $$
+declare
+    v_line jsonb;
+    v_order public.orders;
+    v_quantity numeric;
+    v_price numeric;
+    v_expire_at timestamptz;
+    v_now timestamptz := now();
+begin
+    for v_line in select * from jsonb_array_elements(p_lines) loop
+        select * into v_order
+        from public.orders
+        where id = (v_line ->> 'order_id')::bigint and delete = false
+        for update;
+        if not found then
+            raise exception 'Order % not found', v_line ->> 'order_id'
+                using errcode = 'P0002';
+        end if;
+        if v_order.status::text in ('completed', 'cancelled') then
+            raise exception 'Order % is already %', v_order.id, v_order.status
+                using errcode = '55000';
+        end if;
+
+        v_quantity := (v_line ->> 'quantity_received')::numeric;
+        v_price := coalesce(
+            (v_line ->> 'unit_price_received')::numeric,
+            v_order.unit_price_ordered,
+            0
+        );
+        v_expire_at := (v_line ->> 'expire_at')::timestamptz;
+
+        update public.orders
+        set quantity_received = v_quantity,
+            unit_price_received = v_price,
+            value_received = v_quantity * v_price,
+            status = 'completed',
+            completed_at = v_now,
+            last_updated = v_now,
+            notes = coalesce(v_line ->> 'notes', notes)
+        where id = v_order.id
+        returning * into v_order;
+
+        update public.ingredients
+        set current_stock_level = coalesce(current_stock_level, 0) + v_quantity,
+            value = (coalesce(current_stock_level, 0) + v_quantity)
+                * coalesce(unit_cost, 0),
+            last_received = v_now,
+            last_updated = v_now,
+            expire_at = coalesce(v_expire_at, expire_at)
+        where sku = v_order.ingredient_id;
+
+        insert into public.stock_adjustments (
+            ingredient_sku, adjustment_type, quantity_change, reason,
+            cost_impact, adjusted_by, order_id
+        )
+        values (
+            v_order.ingredient_id, 'received', v_quantity, 'Order received',
+            v_quantity * v_price, p_received_by, v_order.id
+        );
+
+        insert into public.ingredient_batches (
+            ingredient_sku, order_id, quantity_received, quantity_remaining,
+            expire_at, received_at
+        )
+        values (
+            v_order.ingredient_id, v_order.id, v_quantity, v_quantity,
+            v_expire_at, v_now
+        )
+        on conflict (order_id) do nothing;
+
+        return next v_order;
+    end loop;
+end;
+$$;
@@ -0,0 +1,62 @@
+-- Production de recettes en une seule transaction : décrément du stock par
+-- SKU, consommation FEFO des lots et ajustements "recipe_usage" par recette.
+-- p_usages : [{"recipe_id": 1, "ingredient_sku": "SKU", "quantity": 2.5}, ...]
+create or replace function public.record_production(
+    p_usages jsonb,
+    p_adjusted_by text default null
+)
+returns setof public.stock_adjustments
+language plpgsql
+as $$
+declare
+    v_sku record;
+    v_lot record;
+    v_left numeric;
+    v_taken numeric;
+    v_now timestamptz := now();
+begin
+    -- Ordre stable des SKU pour éviter les interblocages entre productions
+    for v_sku in
+        select u.ingredient_sku, sum(u.quantity) as quantity
+        from jsonb_to_recordset(p_usages)
+            as u(recipe_id bigint, ingredient_sku text, quantity numeric)
+        group by u.ingredient_sku
+        order by u.ingredient_sku
+    loop
+        update public.ingredients
+        set current_stock_level = coalesce(current_stock_level, 0) - v_sku.quantity,
+            value = (coalesce(current_stock_level, 0) - v_sku.quantity)
+                * coalesce(unit_cost, 0),
+            last_updated = v_now
+        where sku = v_sku.ingredient_sku;
+
+        v_left := v_sku.quantity;
+        for v_lot in
+            select id, quantity_remaining
+            from public.ingredient_batches
+            where ingredient_sku = v_sku.ingredient_sku and quantity_remaining > 0
+            order by expire_at nulls last, id
+            for update
+        loop
+            exit when v_left <= 0;
+            v_taken := least(v_left, v_lot.quantity_remaining);
+            update public.ingredient_batches
+            set quantity_remaining = quantity_remaining - v_taken
+            where id = v_lot.id;
+            v_left := v_left - v_taken;
+        end loop;
+    end loop;
+
+    return query
+    insert into public.stock_adjustments (
+        ingredient_sku, adjustment_type, quantity_change, reason,
+        cost_impact, adjusted_by, recipe_id
+    )
+    select u.ingredient_sku, 'recipe_usage', -u.quantity, 'Recipe production',
+        u.quantity * coalesce(i.unit_cost, 0), p_adjusted_by, u.recipe_id
+    from jsonb_to_recordset(p_usages)
+        as u(recipe_id bigint, ingredient_sku text, quantity numeric)
+    join public.ingredients i on i.sku = u.ingredient_sku
+    returning *;
+end;
+$$;
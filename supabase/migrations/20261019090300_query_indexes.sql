@@ -0,0 +1,57 @@
+-- Index des requêtes de liste des services. Les listes ne lisent que les
+-- lignes actives, d'où les index partiels "where delete = false".
+create schema if not exists extensions;
+create extension if not exists pg_trgm with schema extensions;
+
+-- ingredients : filtres category / status, recherche ilike sur name et sku
+create index if not exists ingredients_live_category_idx
+    on public.ingredients (category)
+    where delete = false;
+
+create index if not exists ingredients_live_status_idx
+    on public.ingredients (status)
+    where delete = false;
+
+create index if not exists ingredients_name_trgm_idx
+    on public.ingredients using gin (name extensions.gin_trgm_ops)
+    where delete = false;
+
+create index if not exists ingredients_sku_trgm_idx
+    on public.ingredients using gin (sku extensions.gin_trgm_ops)
+    where delete = false;
+
+-- orders : filtres status / ingredient_id / created_at, historique par SKU
+create index if not exists orders_live_status_created_idx
+    on public.orders (status, created_at desc)
+    where delete = false;
+
+create index if not exists orders_live_ingredient_created_idx
+    on public.orders (ingredient_id, created_at desc)
+    where delete = false;
+
+create index if not exists orders_live_created_idx
+    on public.orders (created_at desc)
+    where delete = false;
+
+-- stock_adjustments : historique par SKU, fenêtres par type (pertes, conso)
+create index if not exists stock_adjustments_sku_created_idx
+    on public.stock_adjustments (ingredient_sku, created_at desc);
+
+create index if not exists stock_adjustments_type_created_idx
+    on public.stock_adjustments (adjustment_type, created_at);
+
+-- recipes : filtres category / active, recherche ilike sur name
+create index if not exists recipes_live_category_idx
+    on public.recipes (category, active)
+    where delete = false;
+
+create index if not exists recipes_name_trgm_idx
+    on public.recipes using gin (name extensions.gin_trgm_ops)
+    where delete = false;
+
+-- recipes_ingredients : une ligne par (recette, ingrédient), recherche inverse
+create unique index if not exists recipes_ingredients_recipe_sku_idx
+    on public.recipes_ingredients (recipe_id, ingredient_sku);
+
+create index if not exists recipes_ingredients_sku_idx
+    on public.recipes_ingredients (ingredient_sku);
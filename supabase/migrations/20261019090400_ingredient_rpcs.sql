@@ -0,0 +1,35 @@
+-- RPC appelées par IngredientService, jusqu'ici définies seulement dans le
+-- tableau de bord Supabase.
+
+-- Ajout de stock : met à jour le niveau, la valeur et last_updated
+create or replace function public.add_quantity_to_ingredient(
+    p_product_sku text,
+    p_quantity_to_add numeric
+)
+returns setof public.ingredients
+language sql
+as $$
+    update public.ingredients
+    set current_stock_level = coalesce(current_stock_level, 0) + p_quantity_to_add,
+        value = (coalesce(current_stock_level, 0) + p_quantity_to_add)
+            * coalesce(unit_cost, 0),
+        last_updated = now()
+    where sku = p_product_sku and delete = false
+    returning *;
+$$;
+
+-- Recherche par name ou sku, les plus proches d'abord (index trigram)
+create or replace function public.search_ingredients(search_term text)
+returns setof public.ingredients
+language sql
+stable
+set search_path = public, extensions
+as $$
+    select *
+    from public.ingredients
+    where delete = false
+        and (name ilike '%' || search_term || '%' or sku ilike '%' || search_term || '%')
+    order by greatest(similarity(name, search_term), similarity(sku, search_term)) desc,
+        name
+    limit 50;
+$$;
@@ -0,0 +1,102 @@
+-- Analyse des achats calculée côté base : dépenses par période, par catégorie
+-- et par ingrédient, et écarts commandé / reçu (prix et quantités).
+-- Les commandes annulées ou supprimées sont exclues ; les écarts ne portent
+-- que sur les commandes reçues (completed).
+create or replace function public.order_analytics(
+    p_start timestamptz,
+    p_end timestamptz default null,
+    p_period text default 'month'
+)
+returns jsonb
+language sql
+stable
+as $$
+    with scoped as (
+        select
+            o.*,
+            coalesce(i.category, 'uncategorized') as category,
+            i.name as ingredient_name,
+            o.status::text = 'completed' as received
+        from public.orders o
+        left join public.ingredients i on i.sku = o.ingredient_id
+        where o.delete = false
+            and o.status::text <> 'cancelled'
+            and o.created_at >= p_start
+            and (p_end is null or o.created_at < p_end)
+    ),
+    by_period as (
+        select
+            date_trunc(p_period, created_at) as period,
+            count(*) as orders,
+            sum(coalesce(value_ordered, 0)) as spend_ordered,
+            sum(coalesce(value_received, 0)) filter (where received) as spend_received
+        from scoped
+        group by 1
+    ),
+    by_category as (
+        select
+            category,
+            count(*) as orders,
+            sum(coalesce(value_ordered, 0)) as spend_ordered,
+            sum(coalesce(value_received, 0)) filter (where received) as spend_received
+        from scoped
+        group by 1
+    ),
+    by_ingredient as (
+        select
+            ingredient_id as sku,
+            min(ingredient_name) as name,
+            min(category) as category,
+            count(*) as orders,
+            sum(coalesce(value_ordered, 0)) as spend_ordered,
+            sum(coalesce(value_received, 0)) filter (where received) as spend_received,
+            sum(coalesce(quantity_ordered, 0)) filter (where received) as quantity_ordered,
+            sum(coalesce(quantity_received, 0)) filter (where received) as quantity_received,
+            sum(coalesce(quantity_received, 0) - coalesce(quantity_ordered, 0))
+                filter (where received) as quantity_gap,
+            sum(
+                (coalesce(unit_price_received, 0) - coalesce(unit_price_ordered, 0))
+                * coalesce(quantity_received, 0)
+            ) filter (where received) as price_gap_value
+        from scoped
+        group by 1
+    )
+    select jsonb_build_object(
+        'start', p_start,
+        'end', p_end,
+        'period', p_period,
+        'totals', (
+            select jsonb_build_object(
+                'orders', count(*),
+                'spend_ordered', coalesce(sum(coalesce(value_ordered, 0)), 0),
+                'spend_received',
+                    coalesce(sum(coalesce(value_received, 0)) filter (where received), 0),
+                'quantity_gap', coalesce(
+                    sum(coalesce(quantity_received, 0) - coalesce(quantity_ordered, 0))
+                        filter (where received),
+                    0
+                ),
+                'price_gap_value', coalesce(
+                    sum(
+                        (coalesce(unit_price_received, 0) - coalesce(unit_price_ordered, 0))
+                        * coalesce(quantity_received, 0)
+                    ) filter (where received),
+                    0
+                )
+            )
+            from scoped
+        ),
+        'by_period', coalesce(
+            (select jsonb_agg(to_jsonb(p) order by p.period) from by_period p),
+            '[]'::jsonb
+        ),
+        'by_category', coalesce(
+            (select jsonb_agg(to_jsonb(c) order by c.spend_ordered desc) from by_category c),
+            '[]'::jsonb
+        ),
+        'by_ingredient', coalesce(
+            (select jsonb_agg(to_jsonb(g) order by g.spend_ordered desc) from by_ingredient g),
+            '[]'::jsonb
+        )
+    );
+$$;
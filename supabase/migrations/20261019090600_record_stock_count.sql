@@ -0,0 +1,50 @@
+-- Inventaire en une seule transaction : nouveaux niveaux de stock et
+-- ajustements "manual_count" pour chaque SKU dont le compte diffère.
+-- p_counts : [{"sku": "SKU", "expected": 10, "counted": 8, "cost_impact": 3.2}, ...]
+-- "expected" est le niveau lu au calcul de l'écart : si le stock a bougé
+-- entre-temps, tout l'inventaire est annulé (40001) et doit être recalculé.
+create or replace function public.record_stock_count(
+    p_counts jsonb,
+    p_adjusted_by text default null,
+    p_notes text default null
+)
+returns setof public.stock_adjustments
+language plpgsql
+as $$
+declare
+    v_count record;
+    v_now timestamptz := now();
+begin
+    -- Ordre stable des SKU pour éviter les interblocages
+    for v_count in
+        select c.sku, c.expected, c.counted
+        from jsonb_to_recordset(p_counts)
+            as c(sku text, expected numeric, counted numeric, cost_impact numeric)
+        order by c.sku
+    loop
+        update public.ingredients
+        set current_stock_level = v_count.counted,
+            value = v_count.counted * coalesce(unit_cost, 0),
+            last_updated = v_now
+        where sku = v_count.sku
+            and delete = false
+            and coalesce(current_stock_level, 0) = v_count.expected;
+        if not found then
+            raise exception 'Stock of % changed during the count', v_count.sku
+                using errcode = '40001';
+        end if;
+    end loop;
+
+    return query
+    insert into public.stock_adjustments (
+        ingredient_sku, adjustment_type, quantity_change, reason,
+        cost_impact, adjusted_by, notes, created_at
+    )
+    select c.sku, 'manual_count', c.counted - c.expected, 'Stock count',
+        c.cost_impact, p_adjusted_by, p_notes, v_now
+    from jsonb_to_recordset(p_counts)
+        as c(sku text, expected numeric, counted numeric, cost_impact numeric)
+    order by c.sku
+    returning *;
+end;
+$$;
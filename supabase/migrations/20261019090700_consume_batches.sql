@@ -0,0 +1,41 @@
+-- Consommation FEFO des lots d'un SKU en une seule transaction : les lots
+-- sont verrouillés (for update) et décrémentés en place, deux sorties
+-- concurrentes ne peuvent donc pas vider deux fois le même lot.
+-- Retourne {"batches": [lots modifiés], "uncovered_quantity": reste}.
+create or replace function public.consume_batches(
+    p_sku text,
+    p_quantity numeric
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_lot record;
+    v_left numeric := p_quantity;
+    v_taken numeric;
+    v_touched jsonb := '[]'::jsonb;
+    v_row public.ingredient_batches;
+begin
+    for v_lot in
+        select id, quantity_remaining
+        from public.ingredient_batches
+        where ingredient_sku = p_sku and quantity_remaining > 0
+        order by expire_at nulls last, id
+        for update
+    loop
+        exit when v_left <= 0;
+        v_taken := least(v_left, v_lot.quantity_remaining);
+        update public.ingredient_batches
+        set quantity_remaining = quantity_remaining - v_taken
+        where id = v_lot.id
+        returning * into v_row;
+        v_touched := v_touched || to_jsonb(v_row);
+        v_left := v_left - v_taken;
+    end loop;
+
+    return jsonb_build_object(
+        'batches', v_touched,
+        'uncovered_quantity', greatest(v_left, 0)
+    );
+end;
+$$;
@@ -0,0 +1,42 @@
+-- Ajustement de stock et consommation FEFO des lots dans la même transaction :
+-- si la consommation échoue, l'ajustement n'est pas enregistré non plus.
+-- p_adjustment : ligne de stock_adjustments en jsonb (sans id ni created_at).
+-- Retourne {"adjustment": ligne insérée, "consumed": résultat de consume_batches
+-- ou null pour les types qui ne sortent pas de stock en FEFO}.
+create or replace function public.record_adjustment(p_adjustment jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_row public.stock_adjustments;
+    v_consumed jsonb;
+begin
+    insert into public.stock_adjustments (
+        ingredient_sku, adjustment_type, quantity_change, reason,
+        waste_category, notes, evidence_url, cost_impact, adjusted_by,
+        order_id, recipe_id
+    )
+    values (
+        p_adjustment ->> 'ingredient_sku',
+        p_adjustment ->> 'adjustment_type',
+        (p_adjustment ->> 'quantity_change')::numeric,
+        p_adjustment ->> 'reason',
+        p_adjustment ->> 'waste_category',
+        p_adjustment ->> 'notes',
+        p_adjustment ->> 'evidence_url',
+        coalesce((p_adjustment ->> 'cost_impact')::numeric, 0),
+        p_adjustment ->> 'adjusted_by',
+        (p_adjustment ->> 'order_id')::bigint,
+        (p_adjustment ->> 'recipe_id')::bigint
+    )
+    returning * into v_row;
+
+    if v_row.adjustment_type in ('recipe_usage', 'waste') then
+        v_consumed := public.consume_batches(
+            v_row.ingredient_sku, abs(v_row.quantity_change)
+        );
+    end if;
+
+    return jsonb_build_object('adjustment', to_jsonb(v_row), 'consumed', v_consumed);
+end;
+$$;
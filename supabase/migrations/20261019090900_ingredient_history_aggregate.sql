@@ -0,0 +1,61 @@
+-- Historique d'un ingrédient agrégé par heure, jour ou semaine côté base :
+-- seules les tranches remontent, plus toutes les lignes de la fenêtre.
+-- Les commandes supprimées sont exclues, et absentes dès qu'un type
+-- d'ajustement est demandé (elles n'en ont pas). Bornes incluses.
+create or replace function public.ingredient_history_aggregate(
+    p_sku text,
+    p_interval text,
+    p_adjustment_type text default null,
+    p_start timestamptz default null,
+    p_end timestamptz default null
+)
+returns jsonb
+language sql
+stable
+as $$
+    with movements as (
+        select
+            date_trunc(p_interval, a.created_at) as bucket,
+            greatest(coalesce(a.quantity_change, 0), 0) as quantity_in,
+            greatest(-coalesce(a.quantity_change, 0), 0) as quantity_out,
+            coalesce(a.quantity_change, 0) as net_change,
+            coalesce(a.cost_impact, 0) as cost_impact,
+            0::numeric as quantity_ordered,
+            0::numeric as value_ordered
+        from public.stock_adjustments a
+        where a.ingredient_sku = p_sku
+            and (p_adjustment_type is null or a.adjustment_type = p_adjustment_type)
+            and (p_start is null or a.created_at >= p_start)
+            and (p_end is null or a.created_at <= p_end)
+        union all
+        select
+            date_trunc(p_interval, o.created_at),
+            0,
+            0,
+            0,
+            0,
+            coalesce(o.quantity_ordered, 0),
+            coalesce(o.value_ordered, 0)
+        from public.orders o
+        where p_adjustment_type is null
+            and o.ingredient_id = p_sku
+            and o.delete = false
+            and (p_start is null or o.created_at >= p_start)
+            and (p_end is null or o.created_at <= p_end)
+    ),
+    buckets as (
+        select
+            bucket,
+            sum(quantity_in) as quantity_in,
+            sum(quantity_out) as quantity_out,
+            sum(net_change) as net_change,
+            sum(cost_impact) as cost_impact,
+            sum(quantity_ordered) as quantity_ordered,
+            sum(value_ordered) as value_ordered,
+            count(*) as movements
+        from movements
+        group by 1
+    )
+    select coalesce(jsonb_agg(to_jsonb(b) order by b.bucket), '[]'::jsonb)
+    from buckets b;
+$$;
@@ -0,0 +1,136 @@
+-- Vérifie que chaque requête de liste des services s'appuie sur l'index prévu.
+-- Lancement sur la base locale : supabase start && supabase test db
+-- Les tables locales sont presque vides : sans enable_seqscan = off le
+-- planificateur préférerait toujours un parcours séquentiel.
+begin;
+create extension if not exists pgtap with schema extensions;
+set search_path = public, extensions;
+set local enable_seqscan = off;
+
+create function pg_temp.plan_of(query text)
+returns text
+language plpgsql
+as $$
+declare
+    v_plan json;
+begin
+    execute 'explain (format json) ' || query into v_plan;
+    return v_plan::text;
+end;
+$$;
+
+-- Le plan doit nommer chacun des index attendus : sans cela, n'importe quel
+-- index partiel (delete = false) parcouru en entier suffirait
+create function pg_temp.uses_index(query text, variadic indexes text[])
+returns boolean
+language sql
+as $$
+    select pg_temp.plan_of(query) not like '%"Seq Scan"%'
+        and bool_and(pg_temp.plan_of(query) like '%"Index Name": "' || x || '"%')
+    from unnest(indexes) as x;
+$$;
+
+select plan(16);
+
+-- IngredientService.get_ingredients
+select ok(
+    pg_temp.uses_index($q$select * from public.ingredients
+        where delete = false and category = 'Légumes'$q$, 'ingredients_live_category_idx'),
+    'ingredients filtered by category'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.ingredients
+        where delete = false and status = 'low'$q$, 'ingredients_live_status_idx'),
+    'ingredients filtered by status'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.ingredients
+        where delete = false and (name ilike '%tom%' or sku ilike '%tom%')$q$, 'ingredients_name_trgm_idx', 'ingredients_sku_trgm_idx'),
+    'ingredients searched by name or sku'
+);
+-- Corps de search_ingredients (un EXPLAIN de la RPC ne montre qu'un Function Scan)
+select ok(
+    pg_temp.uses_index($q$select * from public.ingredients
+        where delete = false
+            and (name ilike '%' || 'tom' || '%' or sku ilike '%' || 'tom' || '%')
+        order by greatest(similarity(name, 'tom'), similarity(sku, 'tom')) desc
+        limit 50$q$, 'ingredients_name_trgm_idx', 'ingredients_sku_trgm_idx'),
+    'search_ingredients RPC'
+);
+
+-- OrdersService.get_orders / get_ingredient_orders
+select ok(
+    pg_temp.uses_index($q$select * from public.orders
+        where delete = false and status = 'pending'$q$, 'orders_live_status_created_idx'),
+    'orders filtered by status'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.orders
+        where delete = false and ingredient_id = 'SKU-1'$q$, 'orders_live_ingredient_created_idx'),
+    'orders filtered by ingredient'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.orders
+        where delete = false and created_at >= now() - interval '30 days'$q$, 'orders_live_created_idx'),
+    'orders filtered by creation date'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.orders
+        where ingredient_id = 'SKU-1' and delete = false
+        order by created_at desc limit 10$q$, 'orders_live_ingredient_created_idx'),
+    'latest orders of an ingredient'
+);
+
+-- IngredientService.get_history / get_history_aggregate
+select ok(
+    pg_temp.uses_index($q$select * from public.stock_adjustments
+        where ingredient_sku = 'SKU-1' and created_at < now()
+        order by created_at desc limit 51$q$, 'stock_adjustments_sku_created_idx'),
+    'adjustment history of an ingredient'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.orders
+        where ingredient_id = 'SKU-1' and delete = false and created_at < now()
+        order by created_at desc limit 51$q$, 'orders_live_ingredient_created_idx'),
+    'order history of an ingredient'
+);
+
+-- Fenêtres de pertes (tableau de bord) et de consommation (réappro)
+select ok(
+    pg_temp.uses_index($q$select created_at, cost_impact from public.stock_adjustments
+        where adjustment_type = 'waste' and created_at >= now() - interval '7 days'$q$, 'stock_adjustments_type_created_idx'),
+    'recent waste window'
+);
+select ok(
+    pg_temp.uses_index($q$select ingredient_sku, quantity_change from public.stock_adjustments
+        where adjustment_type in ('recipe_usage', 'waste')
+            and created_at >= now() - interval '28 days'$q$, 'stock_adjustments_type_created_idx'),
+    'recent usage window'
+);
+
+-- RecipeService.get_recipes
+select ok(
+    pg_temp.uses_index($q$select * from public.recipes
+        where delete = false and category = 'Plats' and active = true$q$, 'recipes_live_category_idx'),
+    'recipes filtered by category'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.recipes
+        where delete = false and name ilike '%salade%'$q$, 'recipes_name_trgm_idx'),
+    'recipes searched by name'
+);
+
+-- RecipeService.get_ingredients_of_recipe(s) / IngredientService.get_recipes
+select ok(
+    pg_temp.uses_index($q$select * from public.recipes_ingredients
+        where recipe_id in (1, 2, 3)$q$, 'recipes_ingredients_recipe_sku_idx'),
+    'ingredients of recipes'
+);
+select ok(
+    pg_temp.uses_index($q$select * from public.recipes_ingredients
+        where ingredient_sku = 'SKU-1'$q$, 'recipes_ingredients_sku_idx'),
+    'recipes using an ingredient'
+);
+
+select * from finish();
+rollback;